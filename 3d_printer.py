@@ -9,7 +9,8 @@ Implemented Features:
 - Connect to the 3D printer via Telnet.
 - Send G-code commands to the printer.
 - Initialize the printer (e.g., homing axes).
-- Move the probe to specific positions.
+- Move the probe to specific positions, individually or as a batch.
+- Stream G-code with a sliding window of unacknowledged commands.
 
 Missing Features:
 - Error handling for connection failures.
@@ -17,11 +18,16 @@ Missing Features:
 """
 
 import socket
+import threading
+import time
 
 class PrinterConnection:
     PASSWORD = "ercerc9"  # Define the password for the 3D printer
     FAST_Z_MOVE = 10  # Fast Z move height in mm
     NOZZLE_HEIGHT = 3  # Nozzle height in mm for calibration
+    GCODE_WINDOW = 8  # Maximum number of commands sent without an "ok" back
+    ACK_TIMEOUT = 10.0  # Seconds to wait for an "ok" or for a free slot in the window
+    HOMING_TIMEOUT = 120.0  # Seconds allowed for homing and probing moves (G28, G30)
 
     def __init__(self, ip, port=23):
         """
@@ -34,11 +40,32 @@ class PrinterConnection:
         self.port = port
         self.socket = None
 
+        # Windowed streaming state: a reader thread matches each "ok" to the oldest command.
+        # Commands are counted as sent and acknowledged, so the n-th "ok" always belongs to
+        # the n-th command even after a wait for it has timed out.
+        self._window = threading.Semaphore(self.GCODE_WINDOW)
+        self._idle = threading.Condition()
+        self._sent = 0
+        self._acked = 0
+        self._last_response = None
+        self._reader = None
+        self._reader_stopped = False
+
     def connect(self):
-        """Establish a Telnet connection to the 3D printer and send the password."""
+        """
+        Establish a Telnet connection to the 3D printer and send the password.
+
+        :return: True if the connection was established and authenticated.
+        """
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # G-code lines are tiny: send each one immediately instead of letting Nagle's
+            # algorithm hold it back waiting for the previous line's (delayed) ACK
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 16)
             self.socket.connect((self.ip, self.port))
+            if hasattr(socket, "TCP_QUICKACK"):  # Linux only: acknowledge responses right away
+                self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
             print(f"Connected to 3D printer at {self.ip}:{self.port}")
 
             # Wait for the password prompt
@@ -55,46 +82,202 @@ class PrinterConnection:
                     print("Password accepted.")
                 else:
                     print("Failed to authenticate with the printer. Check the password.")
+                    self._close_socket()
+                    return False
             else:
                 print("Unexpected response from the printer. Authentication failed.")
+                self._close_socket()
+                return False
+
+            # From here on every response is read by the background thread
+            self._start_reader()
+            return True
         except Exception as e:
             print(f"Failed to connect to 3D printer: {e}")
-            self.socket = None
+            self._close_socket()
+            return False
 
     def disconnect(self):
         """Close the Telnet connection to the 3D printer."""
         if self.socket:
             # Home all axes before disconnecting
             print("Homing all axes before disconnecting...")
-            self.send_gcode("G28")  # G28 is the G-code for homing all axes
+            self.send_gcode("G28", timeout=self.HOMING_TIMEOUT)  # G28 is the G-code for homing all axes
 
             # Turn off the motors
             print("Turning off motors...")
             self.send_gcode("M81")  # M81 is the G-code to turn off motors
 
-            # Close the connection
-            self.socket.close()
+            # Close the connection; the shutdown wakes the reader thread blocked in recv
+            self._close_socket()
+            if self._reader is not None:
+                self._reader.join(timeout=1.0)
+                self._reader = None
             print("Disconnected from 3D printer.")
-            self.socket = None
 
-    def send_gcode(self, command):
+    def _close_socket(self):
+        """Shut down and close the socket (close() alone does not interrupt a blocked recv)."""
+        if self.socket is None:
+            return
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # Not connected
+        self.socket.close()
+        self.socket = None
+
+    def _start_reader(self):
+        """Start the background thread that collects the printer's responses."""
+        self._reader_stopped = False
+        self._reader = threading.Thread(target=self._read_responses, args=(self.socket,), daemon=True)
+        self._reader.start()
+
+    def _read_responses(self, sock):
+        """
+        Read responses from the socket and acknowledge one command per "ok" line.
+
+        Lines received before an "ok" are kept as that command's response; an "ok"
+        with no command waiting for it is ignored.
+        """
+        pending = ""
+        lines = []
+        try:
+            while True:
+                data = sock.recv(1024)
+                if not data:
+                    break
+                pending += data.decode(errors="replace")
+                *complete, pending = pending.split("\n")
+                for line in complete:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    lines.append(line)
+                    if line.lower().startswith("ok"):
+                        response = "\n".join(lines)
+                        lines = []
+                        with self._idle:
+                            if self._acked == self._sent:
+                                continue  # Unsolicited "ok"
+                            self._acked += 1
+                            self._last_response = response
+                            self._idle.notify_all()
+                        self._window.release()
+        except OSError:
+            pass  # Socket shut down by disconnect()
+        finally:
+            # Nothing will be acknowledged any more: free the window and wake flush()
+            with self._idle:
+                for _ in range(self._sent - self._acked):
+                    self._window.release()
+                self._reader_stopped = True
+                self._idle.notify_all()
+
+    def _reserve(self, count, timeout):
+        """
+        Take count slots of the command window, waiting at most timeout seconds in total.
+
+        :return: True if the slots were taken; on timeout none are kept.
+        """
+        deadline = time.monotonic() + timeout
+        for taken in range(count):
+            if not self._window.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                for _ in range(taken):
+                    self._window.release()
+                print(f"Error: no G-code acknowledgement within {timeout} s, command not sent.")
+                return False
+        return True
+
+    def enqueue(self, command, timeout=ACK_TIMEOUT):
         """
-        Send a G-code command to the 3D printer.
+        Send a G-code command without waiting for its response.
+
+        Blocks only while GCODE_WINDOW commands are already unacknowledged.
 
         :param command: G-code command as a string.
-        :return: Response from the printer.
+        :param timeout: Maximum time to wait for a free window slot in seconds.
+        :return: True if the command was sent.
         """
         if not self.socket:
             print("Printer is not connected.")
-            return None
+            return False
+        if not self._reserve(1, timeout):
+            return False
+        with self._idle:
+            self._sent += 1
         try:
             self.socket.sendall((command + "\n").encode())
-            response = self.socket.recv(1024).decode()
-            print(f"Sent: {command}, Received: {response.strip()}")
-            return response.strip()
+            return True
         except Exception as e:
             print(f"Error sending G-code command: {e}")
+            with self._idle:
+                self._sent -= 1
+                self._idle.notify_all()
+            self._window.release()
+            return False
+
+    def enqueue_lines(self, commands, timeout=ACK_TIMEOUT):
+        """
+        Send several G-code commands with as few socket writes as the window allows.
+
+        The commands go out in chunks of up to GCODE_WINDOW lines; each chunk waits
+        for its window slots and is then joined into a single sendall.
+
+        :param commands: List of G-code command strings.
+        :param timeout: Maximum time to wait for the window slots of each chunk in seconds.
+        :return: True if every command was sent.
+        """
+        if not self.socket:
+            print("Printer is not connected.")
+            return False
+        for start in range(0, len(commands), self.GCODE_WINDOW):
+            chunk = commands[start:start + self.GCODE_WINDOW]
+            if not self._reserve(len(chunk), timeout):
+                return False
+            with self._idle:
+                self._sent += len(chunk)
+            try:
+                self.socket.sendall(("\n".join(chunk) + "\n").encode())
+            except Exception as e:
+                print(f"Error sending G-code commands: {e}")
+                with self._idle:
+                    self._sent -= len(chunk)
+                    self._idle.notify_all()
+                for _ in chunk:
+                    self._window.release()
+                return False
+        return True
+
+    def flush(self, timeout=ACK_TIMEOUT):
+        """
+        Wait until every sent command has been acknowledged (use before measuring).
+
+        :param timeout: Maximum time to wait in seconds.
+        :return: Response to the last sent command, or None if it was not
+                 acknowledged within the timeout.
+        """
+        with self._idle:
+            target = self._sent
+            self._idle.wait_for(lambda: self._acked >= target or self._reader_stopped, timeout)
+            if self._acked < target:
+                print(f"Warning: {target - self._acked} G-code command(s) still unacknowledged.")
+                return None
+            return self._last_response
+
+    def send_gcode(self, command, timeout=ACK_TIMEOUT):
+        """
+        Send a G-code command to the 3D printer and wait for its response.
+
+        :param command: G-code command as a string.
+        :param timeout: Maximum time to wait for the response in seconds
+                        (use HOMING_TIMEOUT for homing and probing).
+        :return: Response from the printer, or None if it did not answer in time.
+        """
+        if not self.enqueue(command, timeout):
             return None
+        response = self.flush(timeout)
+        print(f"Sent: {command}, Received: {response}")
+        return response
 
     def initialize_printer(self):
         """
@@ -111,7 +294,7 @@ class PrinterConnection:
             print(f"Motors turned on: {response_m80}")
         
         # Home all axes
-        response_g28 = self.send_gcode("G28")  # G28 is the G-code for homing all axes
+        response_g28 = self.send_gcode("G28", timeout=self.HOMING_TIMEOUT)  # G28 is the G-code for homing all axes
         if response_g28:
             print(f"Axes homed: {response_g28}")
         
@@ -121,13 +304,13 @@ class PrinterConnection:
             print(f"Fast Z move response: {response_fast_z}")
         
         # Calibrate Z-axis using magnetic probe
-        response_g30 = self.send_gcode(f"G30 Z{self.NOZZLE_HEIGHT}")
+        response_g30 = self.send_gcode(f"G30 Z{self.NOZZLE_HEIGHT}", timeout=self.HOMING_TIMEOUT)
         if response_g30:
             print(f"Z-axis calibration response: {response_g30}")
         
         return response_g30
 
-    def move_probe(self, x, y, z=None, feedrate=3000):
+    def move_probe(self, x, y, z=None, feedrate=3000, wait=True):
         """
         Move the probe to a specific (X, Y, Z) position.
 
@@ -135,14 +318,44 @@ class PrinterConnection:
         :param y: Y-coordinate in mm.
         :param z: Z-coordinate in mm (optional).
         :param feedrate: Movement speed in mm/min (default: 3000).
-        :return: Response from the printer.
+        :param wait: Wait for the printer's response; if False the move is only
+                     streamed and flush() must be called before relying on it.
+        :return: Response from the printer (None when wait is False).
         """
         gcode_command = f"G1 X{x:.3f} Y{y:.3f}"
         if z is not None:
             gcode_command += f" Z{z:.3f}"
         gcode_command += f" F{feedrate}"
+        if not wait:
+            self.enqueue(gcode_command)
+            return None
         return self.send_gcode(gcode_command)
 
+    def move_probe_batch(self, points, feedrate=3000, debug=True, wait=True):
+        """
+        Move the probe through several positions, synchronizing only once at the end.
+
+        The moves are formatted up front and streamed through the command window in
+        as few writes as possible, followed by a single M400 whose "ok" only comes
+        back once the last move has completed.
+
+        :param points: Iterable of (x, y, z) tuples in mm.
+        :param feedrate: Movement speed in mm/min (default: 3000).
+        :param debug: Print the number of moves sent.
+        :param wait: Wait for the M400 acknowledgement; if False, call flush()
+                     before measuring at the final position.
+        :return: Response to the M400 (None when wait is False or sending failed).
+        """
+        lines = [f"G1 X{x:.3f} Y{y:.3f} Z{z:.3f} F{feedrate}" for x, y, z in points]
+        lines.append("M400")  # Single synchronization point after the last move
+        if not self.enqueue_lines(lines):
+            return None
+        if debug:
+            print(f"Moving probe through {len(lines) - 1} position(s), F={feedrate}")
+        if not wait:
+            return None
+        return self.flush()
+
 if __name__ == "__main__":
     # IP address and port configuration for standalone testing
     PRINTER_IP = "192.168.1.127"  # Replace with the actual IP address of the 3D printer
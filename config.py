@@ -8,6 +8,8 @@
 # Centralizing these parameters makes it easier to adjust the system for
 # different PCBs, frequencies, and measurement conditions.
 
+import numpy as np
+
 # PCB-related constants
 #PCB_SIZE_CM = (2.165, 1.53)  # PCB size in centimeters (width, height)
 #PCB_SIZE_CM = (2.55, 2.0)  # large PCB size in centimeters (width, height)
@@ -24,8 +26,12 @@ MAX_HEIGHT_COMPONENT_Y_MM = 5.0   # Y position of the highest component in mm
 
 RESOLUTION = 30  # Resolution in points per centimeter
 STEP_SIZE = 1 / RESOLUTION  # Step size in centimeters
-x_values = [i * STEP_SIZE for i in range(int(PCB_SIZE_CM[0] / STEP_SIZE) + 1)]
-y_values = [i * STEP_SIZE for i in range(int(PCB_SIZE_CM[1] / STEP_SIZE) + 1)]
+# Integer point counts avoid float drift; the epsilon guards products that land just below an integer
+X_POINTS = int(PCB_SIZE_CM[0] * RESOLUTION + 1e-9) + 1
+Y_POINTS = int(PCB_SIZE_CM[1] * RESOLUTION + 1e-9) + 1
+# Grid index of any coordinate is exactly round(value * RESOLUTION)
+x_values = np.linspace(0.0, (X_POINTS - 1) / RESOLUTION, X_POINTS)
+y_values = np.linspace(0.0, (Y_POINTS - 1) / RESOLUTION, Y_POINTS)
 
 # Radio measurement configuration
 CENTER_FREQUENCY = 400e6  # Center frequency in Hz (default: 400 MHz)
@@ -46,13 +52,24 @@ with open("password.txt", "r") as file:
 
 PRINTER_WAIT = 0.1  # Wait time in seconds (100 ms) after movement for stabilization
 PRINTER_WAIT_LINE = 0.3  # Wait time in seconds at the beginning of each new line
+SERPENTINE_SCAN = True  # Scan odd rows right-to-left so the head never flies back to X min between rows
+ADAPTIVE_SCAN = False  # Measure a coarse grid first, then only refine where the field changes quickly
+ADAPTIVE_COARSE_STEP = 3  # Coarse pass measures every Nth grid point in X and Y
+ADAPTIVE_GRADIENT_DB = 1.0  # Refine around coarse points whose field gradient exceeds this (dB per coarse step)
+POWER_REFRESH_MS = 150  # Interval in ms between power readings in the head adjustment window (live feedback while tuning Z)
+POWER_POLL_MS = 100  # Interval in ms at which the head adjustment window picks up the latest reading
 
 # Hardware simulation flag
 SIMULATE_USRP = False  # Set to True to run without actual USRP hardware for testing
+SIMULATE_PRINTER = False  # Set to True when the printer is simulated as well (full simulation: no live plot, progress is only logged)
+SIMULATED_NOISE_DB = 0.0  # Std. dev. in dB of random noise added to the simulated field (0 = smooth field)
 
 # Debug settings
 DEBUG_ALL = False  # Set to True to enable verbose debug output throughout scanning
-DEBUG_INTERRACTIVE = True  # If True, print debug commands and update graphical view after each measurement
+DEBUG_INTERRACTIVE = True  # If True, print debug output and update graphical view after each scanned row
+DEBUG_MESSAGE = False  # If True, also print every G-code move and measured value (slow on a terminal)
+PLOT_UPDATE_INTERVAL_S = 0.5  # Minimum time in seconds between live plot redraws (last row is always drawn)
+LIVE_PLOT_CLIM_DBM = (-100, -30)  # Fixed live plot color range in dBm (colorbar never redrawn); None to follow the measurements
 
 # USRP buffer and movement settings
 MOVEMENT_SETTLE_DELAY = 0.05  # Delay after movement (in seconds) to allow mechanics to stabilize
@@ -62,6 +79,10 @@ BUFFER_FLUSH_COUNT = 8  # Increased from 3 to 8 to better handle buffering issue
 #PCB_IMAGE_PATH = "./pcb_large_1.jpg"  # Path to the PCB image
 PCB_IMAGE_PATH = "./pcb_small.jpg"  # Path to the PCB image
 OUTPUT_FILE = "scan_v1a_400MHz_Rx_small.json"  # Default output file name
+PRETTY_JSON = False  # If True, indent saved JSON for human reading (larger and slower to write)
+SAVE_NPZ = True  # Also save each scan as a dense compressed .npz grid (plot_field can load it)
+SAVE_MEMMAP_GRID = True  # Write each point into a memory-mapped float32 grid (<scan>.grid.bin + .grid.json) as it is measured
+SCAN_LOG_FLUSH_EVERY = 10  # Points between flushes of the per-point NDJSON scan log (<scan>.jsonl)
 
 # Visualization configuration
 VERTICAL_FLIP = True # Whether to flip the PCB image vertically for proper alignment
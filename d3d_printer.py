@@ -9,13 +9,16 @@ Implemented Features:
 - Connect to the 3D printer via HTTP.
 - Send G-code commands to the printer.
 - Initialize the printer (e.g., homing axes).
-- Move the probe to specific positions.
+- Move the probe to specific positions, individually or as a batch.
 """
 
 import requests
 import time
 from config import DEFAULT_Z, DEBUG_ALL, PRINTER_PASSWORD, PRINTER_WAIT
 
+# Linear move template, formatted positionally for every point of a scan
+MOVE_TEMPLATE = "G1 X{:.3f} Y{:.3f} Z{:.3f} F{}"
+
 class PrinterConnection:
     """Class to handle 3D printer connection and control via the Duet HTTP API."""
     
@@ -81,8 +84,9 @@ class PrinterConnection:
         try:
             if debug:
                 print(f"DEBUG: Sending G-code: {command}")
-            gcode_url = f"{self.base_url}/rr_gcode?gcode={command}"
-            response = self.session.get(gcode_url, timeout=10)
+            gcode_url = f"{self.base_url}/rr_gcode"
+            # Let requests URL-encode the command so multi-line batches survive the query string
+            response = self.session.get(gcode_url, params={"gcode": command}, timeout=10)
             if response.status_code == 200:
                 return response.text.strip()
             print(f"ERROR: Failed to send G-code: {response.status_code} - {response.text}")
@@ -116,6 +120,38 @@ class PrinterConnection:
         
         return response
     
+    def move_probe_batch(self, points, feedrate=3000, debug=True, wait=True):
+        """
+        Move the probe through several positions with a single G-code request.
+        
+        All moves are sent as one multi-line block followed by a single M400,
+        so the printer's planner can chain them and only one HTTP round-trip
+        is paid for the whole batch.
+        
+        Args:
+            points: Iterable of (x, y, z) tuples in mm
+            feedrate: Movement speed in mm/min
+            debug: Whether to print debug messages
+            wait: Whether to sleep PRINTER_WAIT for stabilization before returning;
+                  pass False to do other work while the head moves and wait afterwards
+            
+        Returns:
+            str: Response from the printer, or None if there was an error
+        """
+        lines = [MOVE_TEMPLATE.format(x, y, z, feedrate) for x, y, z in points]
+        lines.append("M400")  # Single synchronization point after the last move
+        
+        if debug:
+            print(f"DEBUG: Moving probe through {len(lines) - 1} position(s), F={feedrate}")
+        
+        response = self.send_gcode("\n".join(lines), debug=debug)
+        
+        # Wait for stabilization once the batch is complete
+        if wait:
+            time.sleep(PRINTER_WAIT)
+        
+        return response
+    
     def initialize_printer(self):
         """Initialize the printer (home axes, set units, etc.)."""
         if not self.connected:
@@ -13,7 +13,13 @@ import os
 import numpy as np  # Import numpy for array operations
 import tkinter as tk  # Import tkinter for GUI dialogs
 
-def save_scan_results(filename, results, metadata=None):
+# orjson is optional: it serializes large result lists much faster than the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def save_scan_results(filename, results, metadata=None, pretty=False):
     """
     Save scan results to a JSON file with optional metadata.
     
@@ -21,22 +27,266 @@ def save_scan_results(filename, results, metadata=None):
     the scan conditions, hardware settings, and PCB information. The metadata
     is crucial for interpreting the results later and ensuring reproducibility.
     
+    The file is written compactly in a single write (using orjson when it is
+    installed); set pretty=True to get the indented, human-readable layout.
+    
     Args:
         filename: Output file path
         results: List of scan points with field strength measurements
         metadata: Dictionary of scan parameters and settings
+        pretty: Whether to indent the JSON output for human reading
     """
     data = {
         "metadata": metadata or {},  # Include metadata if provided
         "results": results  # Include scan results
     }
     try:
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=4)
+        if pretty:
+            payload = json.dumps(data, indent=4).encode()
+        elif orjson is not None:
+            payload = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            payload = json.dumps(data, separators=(",", ":")).encode()
+        with open(filename, "wb") as f:
+            f.write(payload)
         print(f"Scan results saved to {filename}")
     except Exception as e:
         print(f"Error saving scan results to {filename}: {e}")
 
+def save_scan_results_npz(filename, x_values, y_values, field_grid, metadata=None):
+    """
+    Save a scan as dense arrays in a compressed NumPy .npz file.
+    
+    The grid is stored as float32 (NaN where nothing was measured) together
+    with its coordinate vectors and the metadata as a JSON string. This is
+    much smaller and faster to load than the JSON point list; plot_field
+    reads it directly.
+    
+    Args:
+        filename: Scan results file path (.json is replaced by .npz)
+        x_values: X coordinates of the grid columns
+        y_values: Y coordinates of the grid rows
+        field_grid: 2D array indexed [y_idx, x_idx]
+        metadata: Dictionary of scan parameters and settings
+    """
+    npz_file = filename.rsplit('.json', 1)[0] + '.npz'
+    try:
+        np.savez_compressed(
+            npz_file,
+            x=np.asarray(x_values, dtype=np.float32),
+            y=np.asarray(y_values, dtype=np.float32),
+            z=np.asarray(field_grid, dtype=np.float32),
+            meta=np.asarray(json.dumps(metadata or {}))
+        )
+        print(f"Scan grid saved to {npz_file}")
+    except Exception as e:
+        print(f"Error saving scan grid to {npz_file}: {e}")
+
+def scan_grid_paths(filename):
+    """Return the (grid data, grid header) paths of the memory-mapped grid of a scan results file."""
+    base_name = filename.rsplit('.json', 1)[0]
+    return base_name + '.grid.bin', base_name + '.grid.json'
+
+def open_scan_grid(filename, x_values, y_values, metadata=None):
+    """
+    Create the memory-mapped measurement grid for a scan.
+    
+    The grid is a raw float32 file of shape (len(y_values), len(x_values)),
+    initialized to NaN, with a small JSON header next to it holding the shape,
+    the coordinate vectors and the metadata. Writing grid[y_idx, x_idx] puts the
+    point straight into the OS page cache, and flush() after each row makes the
+    measured rows durable, so the file is usable even if the scan is interrupted.
+    plot_field loads it directly from the .grid.bin path.
+    
+    Args:
+        filename: Scan results file path (.json is replaced by .grid.bin / .grid.json)
+        x_values: X coordinates of the grid columns
+        y_values: Y coordinates of the grid rows
+        metadata: Dictionary of scan parameters and settings
+        
+    Returns:
+        Writable np.memmap indexed [y_idx, x_idx], or None if it could not be created
+    """
+    grid_path, header_path = scan_grid_paths(filename)
+    shape = (len(y_values), len(x_values))
+    try:
+        with open(header_path, "w") as f:
+            json.dump({
+                "shape": shape,
+                "dtype": "float32",
+                "x": [float(v) for v in x_values],
+                "y": [float(v) for v in y_values],
+                "metadata": metadata or {}
+            }, f)
+        grid = np.memmap(grid_path, dtype=np.float32, mode="w+", shape=shape)
+        grid[:] = np.nan
+        grid.flush()
+        return grid
+    except (OSError, ValueError) as e:
+        print(f"Error creating scan grid {grid_path}: {e}")
+        return None
+
+def scan_log_path(filename):
+    """Return the NDJSON point log path that accompanies a scan results file."""
+    return filename.rsplit('.json', 1)[0] + '.jsonl'
+
+def open_scan_log(filename):
+    """
+    Open the write-through NDJSON log for a scan.
+    
+    Every measured point is appended to this file as one JSON object per line
+    while the scan runs, so a crash or printer fault does not lose the points
+    measured so far. The regular JSON results file is still written at the end.
+    
+    Args:
+        filename: Scan results file path (the log uses the same name with .jsonl)
+        
+    Returns:
+        Open binary file object, or None if the log could not be created
+    """
+    log_path = scan_log_path(filename)
+    try:
+        return open(log_path, "wb", buffering=1 << 16)  # Large buffer: written out every SCAN_LOG_FLUSH_EVERY points
+    except OSError as e:
+        print(f"Error opening scan log {log_path}: {e}")
+        return None
+
+def append_scan_point(log_file, x, y, field_strength):
+    """Append one scan point to an NDJSON scan log."""
+    point = {"x": float(x), "y": float(y), "field_strength": float(field_strength)}
+    if orjson is not None:
+        log_file.write(orjson.dumps(point) + b"\n")
+    else:
+        log_file.write(json.dumps(point, separators=(",", ":")).encode() + b"\n")
+
+def load_scan_log(filename):
+    """
+    Load the points recorded in an NDJSON scan log.
+    
+    A partially written last line (e.g. after a crash) is ignored.
+    
+    Args:
+        filename: Path to the .jsonl log, or to the scan results file it belongs to
+        
+    Returns:
+        List of scan points
+    """
+    if not filename.endswith('.jsonl'):
+        filename = scan_log_path(filename)
+    loads = orjson.loads if orjson is not None else json.loads
+    results = []
+    with open(filename, "rb") as f:
+        for line in f:
+            try:
+                results.append(loads(line))
+            except ValueError:
+                print(f"Warning: Skipping incomplete line in {filename}")
+    return results
+
+def results_to_arrays(results):
+    """
+    Unpack scan points into x, y, and field strength arrays in a single pass.
+    
+    Missing field strengths (None) become NaN.
+    
+    Args:
+        results: List of scan points with "x", "y" and "field_strength" keys
+        
+    Returns:
+        Tuple of (x, y, field_strength) numpy arrays
+    """
+    columns = np.array([(p["x"], p["y"], p["field_strength"]) for p in results], dtype=float)
+    if columns.size == 0:
+        columns = np.empty((0, 3))
+    return columns[:, 0], columns[:, 1], columns[:, 2]
+
+def _nearest_index(axis, values):
+    """
+    Index of the closest axis entry for every value (axis sorted ascending).
+    
+    Uses np.searchsorted (O(log N) per value) and then picks the nearer of
+    the two neighbouring entries, so round-off on either side is tolerated.
+    """
+    if len(axis) == 1:
+        return np.zeros(len(values), dtype=np.intp)
+    idx = np.searchsorted(axis, values)
+    np.clip(idx, 1, len(axis) - 1, out=idx)
+    idx -= (values - axis[idx - 1]) < (axis[idx] - values)
+    return idx
+
+def results_to_grid(results):
+    """
+    Scatter scan points onto a dense 2D grid in one vectorized step.
+    
+    The grid axes are the distinct coordinates (rounded to 1e-9 so values that
+    differ only by round-off collapse to one), and each point is placed with a
+    batched np.searchsorted lookup instead of a float equality search.
+    
+    Args:
+        results: List of scan points with "x", "y" and "field_strength" keys
+        
+    Returns:
+        Tuple of (unique_x, unique_y, Z) where Z[yi, xi] holds the field strength
+        (NaN where no point was measured)
+    """
+    x, y, field_strength = results_to_arrays(results)
+    unique_x = np.unique(np.round(x, 9))
+    unique_y = np.unique(np.round(y, 9))
+    Z = np.full((len(unique_y), len(unique_x)), np.nan)
+    if len(results) == 0:
+        return unique_x, unique_y, Z
+
+    Z[_nearest_index(unique_y, y), _nearest_index(unique_x, x)] = field_strength
+    return unique_x, unique_y, Z
+
+def align_scans(*scans):
+    """
+    Pair the points of several scans of the same area by position.
+    
+    The scans need not have the same points or point order (an adaptive scan
+    refines a different set of points for every orientation): all of them are
+    placed on one dense grid spanning every measured coordinate, and only the
+    positions measured in every scan are kept.
+    
+    Args:
+        *scans: Lists of scan points with "x", "y" and "field_strength" keys
+        
+    Returns:
+        Tuple of (x, y, fields) where x and y are the coordinates of the common
+        points in row order and fields holds one field strength array per scan
+    """
+    columns = [results_to_arrays(results) for results in scans]
+    unique_x = np.unique(np.round(np.concatenate([x for x, _, _ in columns]), 9))
+    unique_y = np.unique(np.round(np.concatenate([y for _, y, _ in columns]), 9))
+    grids = []
+    for x, y, field_strength in columns:
+        Z = np.full((len(unique_y), len(unique_x)), np.nan)
+        if len(x):
+            Z[_nearest_index(unique_y, y), _nearest_index(unique_x, x)] = field_strength
+        grids.append(Z)
+    
+    measured = np.all([~np.isnan(Z) for Z in grids], axis=0)
+    yi, xi = np.nonzero(measured)
+    return unique_x[xi], unique_y[yi], [Z[yi, xi] for Z in grids]
+
+def grid_to_results(field_grid, x_values, y_values):
+    """
+    Build the results list of a scan from its dense measurement grid.
+    
+    Args:
+        field_grid: 2D array indexed [y_idx, x_idx], NaN where nothing was measured
+        x_values: X coordinates of the grid columns
+        y_values: Y coordinates of the grid rows
+        
+    Returns:
+        List of scan points in row order, skipping unmeasured positions
+    """
+    yi, xi = np.nonzero(~np.isnan(field_grid))
+    return [
+        {"x": float(x_values[i]), "y": float(y_values[j]), "field_strength": float(field_grid[j, i])}
+        for j, i in zip(yi, xi)
+    ]
+
 def combine_scans(file_0d, file_90d, file_45d=None):
     """
     Combine perpendicular scans to create a more complete field map.
@@ -65,9 +315,12 @@ def combine_scans(file_0d, file_90d, file_45d=None):
     # Extract metadata from the first file
     metadata = data_0d.get("metadata", {}) if isinstance(data_0d, dict) else {}
     
+    # Pair the points by position: an adaptive scan measures a different set of points per orientation
+    x_0d, y_0d, (field_0d, field_90d) = align_scans(results_0d, results_90d)
+    
     # Convert dBm to linear power
-    power_0d = np.power(10, np.array([p["field_strength"] for p in results_0d]) / 10)
-    power_90d = np.power(10, np.array([p["field_strength"] for p in results_90d]) / 10)
+    power_0d = np.power(10, field_0d / 10)
+    power_90d = np.power(10, field_90d / 10)
     
     # Calculate combined power using only 0° and 90° components
     power_combined = np.sqrt(np.power(power_0d, 2) + np.power(power_90d, 2))
@@ -75,14 +328,11 @@ def combine_scans(file_0d, file_90d, file_45d=None):
     # Convert back to dBm
     combined_dbm = 10 * np.log10(power_combined)
     
-    # Create combined results
-    combined_results = []
-    for i, point in enumerate(results_0d):
-        combined_results.append({
-            "x": point["x"],
-            "y": point["y"],
-            "field_strength": float(combined_dbm[i])
-        })
+    # Create combined results; the point dicts are only built here, for saving
+    combined_results = [
+        {"x": x, "y": y, "field_strength": field_strength}
+        for x, y, field_strength in zip(x_0d.tolist(), y_0d.tolist(), combined_dbm.tolist())
+    ]
     
     return {"metadata": metadata, "results": combined_results}
 
@@ -128,6 +378,10 @@ def display_scan(file_name, pcb_image_path):
         # Use the provided file directly
         print(f"Debug: Using provided file: {file_name}")
         return file_name, None, None, False
+    elif os.path.exists(scan_log_path(file_name)):
+        # Interrupted scan: only the per-point NDJSON log was written
+        print(f"Debug: Using scan log: {scan_log_path(file_name)}")
+        return scan_log_path(file_name), None, None, False
     else:
         # No files exist
         print(f"Error: File not found at path: {file_name}")
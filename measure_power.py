@@ -19,10 +19,17 @@ Missing Features:
 import uhd
 import numpy as np
 import time
+from math import log10 as _log10
 import matplotlib.pyplot as plt
 from collections import deque
 from matplotlib.animation import FuncAnimation
 
+# Sample block reused by get_power_dBm across calls (reallocated only if its size changes)
+_sample_buffer = None
+
+# Single-frame receive buffer reused by receive_frame across calls
+_frame_buffer = None
+
 def initialize_radio(freq, gain, rx_bw):
     """
     Initialize the USRP radio with the given parameters.
@@ -66,15 +73,23 @@ def receive_frame(streamer):
     """
     Receive a frame of samples.
 
+    The frame is received into a module-level buffer that is reused across
+    calls, so the returned array is overwritten by the next call. Only the
+    samples actually received are returned (a short read gives a shorter frame).
+
     Args:
         streamer: The RX streamer object.
 
     Returns:
-        numpy.ndarray: Received frame as a numpy array.
+        numpy.ndarray: Received frame as a numpy array, or None on error.
     """
+    global _frame_buffer
     try:
-        # Prepare receive buffer
-        recv_buffer = np.zeros((1, streamer.get_max_num_samps()), dtype=np.complex64)
+        # Prepare receive buffer (allocated on the first call, or if the frame size changes)
+        frame_size = streamer.get_max_num_samps()
+        if _frame_buffer is None or _frame_buffer.shape[1] != frame_size:
+            _frame_buffer = np.empty((1, frame_size), dtype=np.complex64)
+        recv_buffer = _frame_buffer
         metadata = uhd.types.RXMetadata()
 
         # Start the stream
@@ -83,21 +98,56 @@ def receive_frame(streamer):
         streamer.issue_stream_cmd(stream_cmd)
 
         # Receive samples
-        streamer.recv(recv_buffer, metadata, timeout=1.0)
-        if metadata.error_code != uhd.types.RXMetadataErrorCode.none:
+        num_rx_samps = streamer.recv(recv_buffer, metadata, timeout=1.0)
+        if metadata.error_code != uhd.types.RXMetadataErrorCode.none or num_rx_samps == 0:
             return None
 
         # Stop the stream
         stream_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
         streamer.issue_stream_cmd(stream_cmd)
 
-        return recv_buffer[0]
+        # The rest of the reused buffer holds samples from an earlier frame (or garbage)
+        return recv_buffer[0, :num_rx_samps]
+    except Exception:
+        return None
+
+def receive_samples(streamer, num_samps, out=None):
+    """
+    Receive a block of samples with a single num_done stream command.
+
+    Args:
+        streamer: The RX streamer object.
+        num_samps (int): Number of samples to acquire.
+        out (numpy.ndarray): Optional preallocated complex64 buffer of num_samps samples.
+
+    Returns:
+        numpy.ndarray: Received samples as a numpy array, or None on error.
+    """
+    try:
+        samples = np.empty(num_samps, dtype=np.complex64) if out is None else out
+        metadata = uhd.types.RXMetadata()
+
+        # Request the whole block at once instead of starting/stopping the stream per frame
+        stream_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.num_done)
+        stream_cmd.num_samps = num_samps
+        stream_cmd.stream_now = True
+        streamer.issue_stream_cmd(stream_cmd)
+
+        # recv returns at most get_max_num_samps() samples per call, so fill the block in slices
+        received = 0
+        while received < num_samps:
+            num_rx_samps = streamer.recv(samples[received:], metadata, timeout=1.0)
+            if metadata.error_code != uhd.types.RXMetadataErrorCode.none or num_rx_samps == 0:
+                return None
+            received += num_rx_samps
+
+        return samples
     except Exception:
         return None
 
 def get_power_dBm(usrp, streamer, gain, nb_avera=10, freq=400e6, rx_bw=10e6):
     """
-    Perform multiple power measurements, average them in linear scale, and return the averaged power in dBm.
+    Acquire nb_avera frames in one block, average their power in linear scale, and return it in dBm.
     If measurements fail, attempt a lower-level reset of the radio before re-initializing.
 
     Args:
@@ -111,8 +161,6 @@ def get_power_dBm(usrp, streamer, gain, nb_avera=10, freq=400e6, rx_bw=10e6):
     Returns:
         float: Averaged input power in dBm, or None if re-initialization fails.
     """
-    linear_powers = []
-
     def reset_radio(usrp, streamer):
         """Perform a lower-level reset of the USRP."""
         try:
@@ -129,22 +177,22 @@ def get_power_dBm(usrp, streamer, gain, nb_avera=10, freq=400e6, rx_bw=10e6):
         except Exception as e:
             print(f"Error during USRP reset: {e}")
 
-    for attempt in range(3):  # Allow up to two retries after re-initialization
-        for _ in range(nb_avera):
-            frame = receive_frame(streamer)
-            if frame is not None:
-                power_linear = np.mean(np.abs(frame) ** 2)  # Calculate power in linear scale
-                linear_powers.append(power_linear)
-            else:
-                print("Failed to measure power. Retrying...")
-                break  # Exit the loop to attempt a reset or re-initialization
+    global _sample_buffer
 
-        if linear_powers:
-            avg_linear_power = np.mean(linear_powers)
-            avg_power_dbm = 10 * np.log10(avg_linear_power + 1e-12) + 30 - gain
+    for attempt in range(3):  # Allow up to two retries after re-initialization
+        # All nb_avera frames arrive in one num_done request, into a buffer reused across calls
+        num_samps = nb_avera * streamer.get_max_num_samps()
+        if _sample_buffer is None or _sample_buffer.size != num_samps:
+            _sample_buffer = np.empty(num_samps, dtype=np.complex64)
+        samples = receive_samples(streamer, num_samps, out=_sample_buffer)
+        if samples is not None:
+            # Single vectorized reduction over all frames (|s|^2 without the sqrt of np.abs)
+            avg_linear_power = (samples.real * samples.real + samples.imag * samples.imag).mean()
+            avg_power_dbm = 10 * _log10(avg_linear_power + 1e-12) + 30 - gain
             print(f"Measured power: {avg_power_dbm:.2f} dBm (averaged over {nb_avera} frames)")
             return avg_power_dbm
         else:
+            print("Failed to measure power. Retrying...")
             if attempt == 0:  # Perform a lower-level reset on the first failure
                 print("Attempting a lower-level reset of the radio...")
                 reset_radio(usrp, streamer)
@@ -182,13 +230,18 @@ def get_fft(streamer, ax_fft, freq, rx_bw):
     num_samples = len(frame)
     freq_axis = np.linspace(freq - rx_bw / 2, freq + rx_bw / 2, num_samples)
 
-    # Clear and update the FFT plot
-    ax_fft.clear()
-    ax_fft.plot(freq_axis / 1e6, fft_magnitude, label="FFT (dB)")
-    ax_fft.set_title("Real-Time FFT")
-    ax_fft.set_xlabel("Frequency (MHz)")
-    ax_fft.set_ylabel("Magnitude (dB)")
-    ax_fft.legend()
+    # Update the FFT line in place; the axes, labels and legend are only set up on the first frame
+    fft_line = getattr(ax_fft, "fft_line", None)
+    if fft_line is None:
+        ax_fft.fft_line, = ax_fft.plot(freq_axis / 1e6, fft_magnitude, label="FFT (dB)")
+        ax_fft.set_title("Real-Time FFT")
+        ax_fft.set_xlabel("Frequency (MHz)")
+        ax_fft.set_ylabel("Magnitude (dB)")
+        ax_fft.legend()
+    else:
+        fft_line.set_data(freq_axis / 1e6, fft_magnitude)
+        ax_fft.relim()
+        ax_fft.autoscale_view()
 
 def main():
     """
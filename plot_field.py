@@ -5,7 +5,7 @@ This module provides advanced visualization tools for electromagnetic field scan
 It processes scan data and creates visualizations with PCB image overlays.
 
 Key features include:
-- Loading scan results from JSON files with metadata
+- Loading scan results from JSON, NPZ, memory-mapped grid or NDJSON log files with metadata
 - Creating heatmap visualizations of field strength
 - Overlaying PCB images for reference
 - Interactive transparency adjustment
@@ -25,6 +25,7 @@ import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button  # Import Slider and Button widgets
 from PIL import Image  # Import for image rotation
 from scipy.interpolate import griddata  # Import for interpolation
+from file_utils import load_scan_log, results_to_arrays
 
 INPUT_FILE = "./scan_v1a_400MHz_Rx_module1.json"
 PCB_IMAGE_PATH = "./pcb_die.jpg"  # Path to the PCB image
@@ -36,6 +37,61 @@ HORIZONTAL_FLIP = False  # Flip the PCB image horizontally
 SECOND_INPUT_FILE = "./scan_v1a_400MHz_Rx_module2_nores_patched.json"
 SECOND_PCB_IMAGE_PATH = "./pcb_die.jpg"
 
+def load_scan(input_file):
+    """
+    Load a scan file as an array of measured points plus its metadata.
+    
+    Supports the JSON results format (flat list or dict with "metadata" and
+    "results") and the dense NPZ and memory-mapped grid (.grid.bin with its
+    .grid.json header) formats written next to it by the scanner, as well as
+    the per-point NDJSON log (.jsonl), which also covers interrupted scans.
+    
+    Args:
+        input_file: Path to a .json, .npz, .grid.bin or .jsonl scan file
+        
+    Returns:
+        Tuple of (columns, metadata) where columns is an (N, 3) array of
+        x, y (in meters as stored) and field strength for each measured point
+    """
+    if input_file.endswith(".npz") or input_file.endswith(".grid.bin"):
+        if input_file.endswith(".npz"):
+            with np.load(input_file) as npz:
+                metadata = json.loads(str(npz["meta"]))
+                x_values, y_values, Z = npz["x"], npz["y"], npz["z"]
+        else:
+            with open(input_file[:-len(".bin")] + ".json", "r") as f:
+                header = json.load(f)
+            metadata = header.get("metadata", {})
+            x_values, y_values = np.array(header["x"]), np.array(header["y"])
+            # Read-only mapping: only the pages of measured rows are actually read
+            Z = np.memmap(input_file, dtype=header["dtype"], mode="r", shape=tuple(header["shape"]))
+        # Only measured cells (non-NaN) become points, in row order as in the JSON file
+        yi, xi = np.nonzero(~np.isnan(Z))
+        columns = np.column_stack((x_values[xi], y_values[yi], Z[yi, xi])).astype(float)
+        return columns, metadata
+
+    if input_file.endswith(".jsonl"):
+        # One point per line; a partially written last line (crashed scan) is skipped
+        columns = np.column_stack(results_to_arrays(load_scan_log(input_file)))
+        return columns.reshape(-1, 3), {}
+
+    with open(input_file, "r") as f:
+        data = json.load(f)
+
+    # Check if the data is a list (older format) or a dictionary (newer format)
+    if isinstance(data, list):
+        results = data  # Flat list of results (older format)
+        metadata = {}  # No metadata available
+    elif isinstance(data, dict):
+        results = data.get("results", [])  # Use "results" key if available
+        metadata = data.get("metadata", {})  # Extract metadata if available
+    else:
+        raise ValueError(f"Invalid JSON format in {input_file}: Expected a list or a dictionary.")
+
+    # Extract x, y, and field_strength values in a single pass over the results
+    columns = np.array([(point["x"], point["y"], point["field_strength"]) for point in results], dtype=float)
+    return columns.reshape(-1, 3), metadata
+
 def plot_field(input_file, pcb_image_path, save_path=None, ax=None, vmin=None, vmax=None):
     """
     Plot the EM field strength from scan results with PCB overlay and transparency adjustment.
@@ -58,21 +114,12 @@ def plot_field(input_file, pcb_image_path, save_path=None, ax=None, vmin=None, v
     """
     try:
         print(f"Loading scan results from: {input_file}")  # Debug message
-        # Load scan results
-        with open(input_file, "r") as f:  # Use the provided input file
-            data = json.load(f)
-
-        # Check if the data is a list (older format) or a dictionary (newer format)
-        if isinstance(data, list):
-            results = data  # Flat list of results (older format)
-            metadata = {}  # No metadata available
-            print("No metadata found. Using default values.")  # Debug message
-        elif isinstance(data, dict):
-            results = data.get("results", [])  # Use "results" key if available
-            metadata = data.get("metadata", {})  # Extract metadata if available
+        # Load scan results (JSON or NPZ)
+        columns, metadata = load_scan(input_file)
+        if metadata:
             print(f"Metadata found: {metadata}")  # Debug message
         else:
-            raise ValueError("Invalid JSON format: Expected a list or a dictionary.")
+            print("No metadata found. Using default values.")  # Debug message
 
         # Extract metadata with defaults for missing values
         pcb_size = metadata.get("PCB_SIZE", "Unknown")
@@ -95,12 +142,11 @@ def plot_field(input_file, pcb_image_path, save_path=None, ax=None, vmin=None, v
         print(f"  Number of Averages: {nb_average}")
         print(f"  File Name: {file_name}")
 
-        print(f"Successfully loaded {len(results)} data points from {input_file}.")  # Debug message
+        print(f"Successfully loaded {len(columns)} data points from {input_file}.")  # Debug message
 
-        # Extract x, y, and field_strength values
-        x = np.array([point["x"] for point in results]) * 100  # Convert from meters to cm
-        y = np.array([point["y"] for point in results]) * 100  # Convert from meters to cm
-        field_strength = np.array([point["field_strength"] for point in results])
+        x = columns[:, 0] * 100  # Convert from meters to cm
+        y = columns[:, 1] * 100  # Convert from meters to cm
+        field_strength = columns[:, 2]
         print(f"Extracted x, y, and field_strength arrays.")  # Debug message
 
         # Reshape data for plotting
@@ -175,8 +221,7 @@ def plot_field(input_file, pcb_image_path, save_path=None, ax=None, vmin=None, v
             try:
                 # Prepare grid for interpolation
                 grid_x, grid_y = np.linspace(extent[0], extent[1], 200), np.linspace(extent[2], extent[3], 200)
-                grid_X, grid_Y = np.meshgrid(grid_x, grid_y)
-                Z = griddata((x, y), field_strength, (grid_X, grid_Y), method='cubic')
+                Z = griddata((x, y), field_strength, (grid_x[np.newaxis, :], grid_y[:, np.newaxis]), method='cubic')
                 
                 # Draw field heatmap
                 heatmap = ax.imshow(
@@ -246,9 +291,8 @@ def plot_field(input_file, pcb_image_path, save_path=None, ax=None, vmin=None, v
                 # Ensure Z is available for contour plotting
                 if not is_1d_data:
                     grid_x, grid_y = np.linspace(extent[0], extent[1], 200), np.linspace(extent[2], extent[3], 200)
-                    grid_X, grid_Y = np.meshgrid(grid_x, grid_y)
-                    Z = griddata((x, y), field_strength, (grid_X, grid_Y), method='cubic')
-                    ax.contour(grid_X, grid_Y, Z, levels=10, colors='black', linewidths=0.5)
+                    Z = griddata((x, y), field_strength, (grid_x[np.newaxis, :], grid_y[:, np.newaxis]), method='cubic')
+                    ax.contour(grid_x, grid_y, Z, levels=10, colors='black', linewidths=0.5)
                     fig.canvas.draw_idle()
                     print("Contour lines added to the plot.")
                 else:
@@ -304,35 +348,15 @@ def compare_fields(input_file1, pcb_image1, input_file2, pcb_image2):
         pcb_image1/pcb_image2: Paths to the corresponding PCB images
     """
     try:
+        # Both older (flat list) and newer (dictionary with metadata) JSON formats, and NPZ, are handled
         print(f"Loading first scan results from: {input_file1}")
-        with open(input_file1, "r") as f1:
-            data1 = json.load(f1)
+        columns1, metadata1 = load_scan(input_file1)
         print(f"Successfully loaded data from {input_file1}.")
 
         print(f"Loading second scan results from: {input_file2}")
-        with open(input_file2, "r") as f2:
-            data2 = json.load(f2)
+        columns2, metadata2 = load_scan(input_file2)
         print(f"Successfully loaded data from {input_file2}.")
 
-        # Handle both older (flat list) and newer (dictionary with metadata) formats
-        if isinstance(data1, list):
-            results1 = data1  # Flat list of results (older format)
-            metadata1 = {}  # No metadata available
-        elif isinstance(data1, dict):
-            results1 = data1.get("results", [])  # Use "results" key if available
-            metadata1 = data1.get("metadata", {})  # Extract metadata if available
-        else:
-            raise ValueError(f"Invalid JSON format in {input_file1}: Expected a list or a dictionary.")
-
-        if isinstance(data2, list):
-            results2 = data2  # Flat list of results (older format)
-            metadata2 = {}  # No metadata available
-        elif isinstance(data2, dict):
-            results2 = data2.get("results", [])  # Use "results" key if available
-            metadata2 = data2.get("metadata", {})  # Extract metadata if available
-        else:
-            raise ValueError(f"Invalid JSON format in {input_file2}: Expected a list or a dictionary.")
-
         # Extract metadata with defaults for missing values
         pcb_size1 = metadata1.get("PCB_SIZE", "Unknown")
         resolution1 = metadata1.get("resolution", "Unknown")
@@ -373,13 +397,13 @@ def compare_fields(input_file1, pcb_image1, input_file2, pcb_image2):
         print(f"  File Name: {file_name2}")
 
         # Extract x, y, and field_strength values for both scans
-        x1 = np.array([point["x"] for point in results1]) * 100
-        y1 = np.array([point["y"] for point in results1]) * 100
-        field_strength1 = np.array([point["field_strength"] for point in results1])
+        x1 = columns1[:, 0] * 100
+        y1 = columns1[:, 1] * 100
+        field_strength1 = columns1[:, 2]
 
-        x2 = np.array([point["x"] for point in results2]) * 100
-        y2 = np.array([point["y"] for point in results2]) * 100
-        field_strength2 = np.array([point["field_strength"] for point in results2])
+        x2 = columns2[:, 0] * 100
+        y2 = columns2[:, 1] * 100
+        field_strength2 = columns2[:, 2]
 
         # Create unique grids for each measurement
         unique_x1, unique_y1 = np.unique(x1), np.unique(y1)
@@ -388,11 +412,9 @@ def compare_fields(input_file1, pcb_image1, input_file2, pcb_image2):
         grid_x1, grid_y1 = np.linspace(unique_x1[0], unique_x1[-1], 200), np.linspace(unique_y1[0], unique_y1[-1], 200)
         grid_x2, grid_y2 = np.linspace(unique_x2[0], unique_x2[-1], 200), np.linspace(unique_y2[0], unique_y2[-1], 200)
 
-        grid_X1, grid_Y1 = np.meshgrid(grid_x1, grid_y1)
-        grid_X2, grid_Y2 = np.meshgrid(grid_x2, grid_y2)
-
-        Z1 = griddata((x1, y1), field_strength1, (grid_X1, grid_Y1), method='cubic')
-        Z2 = griddata((x2, y2), field_strength2, (grid_X2, grid_Y2), method='cubic')
+        # Rows and columns broadcast to the 200x200 interpolation grids
+        Z1 = griddata((x1, y1), field_strength1, (grid_x1[np.newaxis, :], grid_y1[:, np.newaxis]), method='cubic')
+        Z2 = griddata((x2, y2), field_strength2, (grid_x2[np.newaxis, :], grid_y2[:, np.newaxis]), method='cubic')
 
         # Load and process PCB images with the same flip and rotation settings
         try:
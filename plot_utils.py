@@ -31,28 +31,33 @@ Dependencies:
 - scipy: For interpolating field strength data.
 - PIL (Pillow): For loading and displaying PCB images.
 - json: For handling scan data and metadata.
-- multiprocessing: For parallel processing of current direction calculations.
 """
 
+import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.colorbar import Colorbar  # Import for colorbar detection
+from matplotlib.colors import Normalize
 from plot_field import plot_field
 import tkinter as tk
 import os
 import json
 import numpy as np
-from file_utils import combine_scans
+from file_utils import combine_scans, results_to_arrays, results_to_grid, align_scans
 from scipy.interpolate import griddata
 from PIL import Image
-# Import PCB_IMAGE_PATH, VERTICAL_FLIP, and CURRENT_GRID_SPACING_MM from config
-from config import PCB_IMAGE_PATH, VERTICAL_FLIP, CURRENT_GRID_SPACING_MM
+# Import PCB_IMAGE_PATH, VERTICAL_FLIP, CURRENT_GRID_SPACING_MM and LIVE_PLOT_CLIM_DBM from config
+from config import PCB_IMAGE_PATH, VERTICAL_FLIP, CURRENT_GRID_SPACING_MM, LIVE_PLOT_CLIM_DBM
 import time  # Import for timing calculations
-from multiprocessing import Pool  # Import for parallel processing
+from functools import lru_cache
 
 # Define constants
 GRID_SPACING = 2  # Spacing for current direction lines in mm
+CONTOUR_LEVELS = 50  # Filled contour levels
+
+# ContourPy's "serial" algorithm is ~2x faster than the default; the keyword needs matplotlib >= 3.6
+_MPL_VERSION = tuple(int(part) for part in matplotlib.__version__.split(".")[:2])
+CONTOUR_KWARGS = {"algorithm": "serial"} if _MPL_VERSION >= (3, 6) else {}
 
 def validate_file(file_path):
     if not os.path.exists(file_path):
@@ -66,11 +71,42 @@ def validate_file(file_path):
         return False
     return True
 
-def initialize_plot():
+@lru_cache(maxsize=1)
+def _load_pcb_image():
+    """
+    Decode the PCB photo once (flipped per VERTICAL_FLIP) and reuse it for every plot.
+    
+    Returns:
+        Image as a numpy array, or None if it cannot be loaded
+    """
+    try:
+        pcb_img = Image.open(PCB_IMAGE_PATH)
+        if VERTICAL_FLIP:
+            pcb_img = pcb_img.transpose(Image.FLIP_TOP_BOTTOM)
+        return np.array(pcb_img)
+    except Exception as e:
+        print(f"Error loading PCB image: {e}")
+        return None
+
+def _cell_edges(values):
+    """Return the N+1 cell edges around N evenly spaced sample positions (for pcolormesh)."""
+    values = np.asarray(values, dtype=np.float32)
+    if len(values) < 2:
+        return np.array([values[0] - 0.5, values[0] + 0.5], dtype=np.float32)
+    half_step = (values[1] - values[0]) / 2
+    return np.append(values - half_step, values[-1] + half_step)
+
+def initialize_plot(x_values, y_values):
     """
     Initialize the interactive plot for real-time scanning visualization.
-    Creates a figure, axis, contour plot, and colorbar for displaying field strength.
+    Creates a figure, axis, field mesh, and colorbar for displaying field strength.
     Used during the scanning process to provide immediate feedback.
+    The scan grid is static, so a single pcolormesh is created here once and stored on
+    the axis; update_plot only pushes the scan's measurement grid into it.
+    When the canvas supports blitting, the mesh is animated: the rest of the figure is
+    cached as a background and only the mesh is redrawn on top of it.
+    With LIVE_PLOT_CLIM_DBM set, the color range is fixed up front so the colorbar is never
+    redrawn during the scan; a "Rescale" button fits it once to the measurements so far.
     """
     plt.ion()  # Turn on interactive mode
     fig, ax = plt.subplots(figsize=(8, 6))
@@ -80,81 +116,127 @@ def initialize_plot():
     fig.canvas.manager.set_window_title("Measuring board - real-time scan view")  # Set a more meaningful window title
     ax.set_aspect('equal', adjustable='box')
 
-    # Create an empty 2D array for the initial contour plot
-    empty_x = [0, 1]  # Two points for x-axis
-    empty_y = [0, 1]  # Two points for y-axis
-    empty_z = [[0, 0], [0, 0]]  # 2x2 array of zeros for z-axis
-    contour = ax.contourf(empty_x, empty_y, empty_z, cmap="viridis", levels=50, alpha=0.35)
+    ax.scan_mesh = None
+    if len(y_values) > 1:
+        # PCB photo under the field mesh, drawn once (part of the blitted background)
+        pcb_img = _load_pcb_image()
+        if pcb_img is not None:
+            ax.imshow(pcb_img, extent=(x_values[0], x_values[-1], y_values[0], y_values[-1]),
+                      origin="lower", zorder=0)
+
+        # One cell per scan point, NaN (transparent) until measured
+        empty_z = np.full((len(y_values), len(x_values)), np.nan, dtype=np.float32)
+        ax.scan_fixed_norm = LIVE_PLOT_CLIM_DBM is not None
+        # Without a fixed range, 0-1 is a placeholder until the first row is measured
+        norm = Normalize(*LIVE_PLOT_CLIM_DBM) if ax.scan_fixed_norm else Normalize(0, 1)
+        ax.scan_mesh = ax.pcolormesh(_cell_edges(x_values), _cell_edges(y_values), empty_z,
+                                     cmap="viridis", alpha=0.35, shading="flat", norm=norm)
+        contour = ax.scan_mesh
+        ax.scan_blit = getattr(fig.canvas, "supports_blit", False)
+        if ax.scan_blit:
+            ax.scan_mesh.set_animated(True)  # Excluded from full draws, drawn by _blit_scan_mesh
+    else:
+        # 1D scans are drawn as a line plot by update_plot; the empty contour only feeds the colorbar
+        contour = ax.contourf([0, 1], [0, 1], [[0, 0], [0, 0]], cmap="viridis", levels=CONTOUR_LEVELS,
+                              alpha=0.35, **CONTOUR_KWARGS)
     colorbar = plt.colorbar(contour, ax=ax, label="Field Strength (dBm)")
+
+    if ax.scan_mesh is not None and ax.scan_fixed_norm:
+        def on_rescale(event):
+            # One-off fit of the color range to the points measured so far
+            Z = np.ma.masked_invalid(ax.scan_mesh.get_array())
+            if Z.count() == 0:
+                return
+            ax.scan_mesh.set_clim(Z.min(), Z.max())
+            colorbar.update_normal(ax.scan_mesh)
+            fig.canvas.draw_idle()
+        rescale_ax = fig.add_axes([0.01, 0.01, 0.12, 0.05])
+        ax.scan_rescale_button = Button(rescale_ax, "Rescale")  # Keep a reference so the widget stays alive
+        ax.scan_rescale_button.on_clicked(on_rescale)
+
+    if ax.scan_mesh is not None and ax.scan_blit:
+        def on_draw(event):
+            # Any full redraw (first show, resize, colorbar change) refreshes the cached background
+            ax.scan_background = fig.canvas.copy_from_bbox(ax.bbox)
+            ax.draw_artist(ax.scan_mesh)
+        fig.canvas.mpl_connect("draw_event", on_draw)
+        fig.canvas.draw()
     return fig, ax, contour, colorbar
 
-def update_plot(ax, contour, colorbar, results, x_values, y_values):
+def _blit_scan_mesh(ax):
+    """Redraw only the scan mesh over the cached axes background and push it to the screen."""
+    canvas = ax.figure.canvas
+    canvas.restore_region(ax.scan_background)
+    ax.draw_artist(ax.scan_mesh)
+    canvas.blit(ax.bbox)
+    canvas.flush_events()
+
+def update_plot(ax, contour, colorbar, field_grid, x_values, y_values, clim=None):
     """
     Update the plot with new data during the scanning process.
     This function is called after each row is scanned to provide real-time visualization.
+    field_grid is the scan's dense measurement grid, indexed [y_idx, x_idx] with NaN
+    where no point has been measured yet. clim is the (min, max) of the measurements
+    so far when the caller tracks it, which saves a full sweep of the grid per update.
+    It is ignored when initialize_plot fixed the color range (LIVE_PLOT_CLIM_DBM).
     """
-    x = [point["x"] for point in results]
-    y = [point["y"] for point in results]
-    field_strength = [point["field_strength"] for point in results]
-
-    unique_x = sorted(set(x_values))
-    unique_y = sorted(set(y_values))
-    
-    # Check if we have more than one unique y-value (2D data)
-    is_2d_data = len(unique_y) > 1
-    
-    # Clear previous plot elements
-    for artist in ax.collections:
-        artist.remove()
+    # Check if we have more than one y-value (2D data)
+    is_2d_data = len(y_values) > 1
         
     if is_2d_data:
-        # For 2D data, use meshgrid and contourf as before
-        X, Y = np.meshgrid(unique_x, unique_y)  # Use np.meshgrid instead of plt.meshgrid
-        Z = np.full((len(unique_y), len(unique_x)), np.nan)  # Initialize with NaN values
-
-        for point in results:
-            xi = unique_x.index(point["x"])
-            yi = unique_y.index(point["y"])
-            if point["field_strength"] is not None:  # Check for None values
-                Z[yi][xi] = point["field_strength"]
-
-        try:
-            # Only create contour plot if we have valid data
-            if not np.all(np.isnan(Z)):
-                contour = ax.contourf(X, Y, Z, cmap="viridis", levels=50, alpha=0.35)
-                # Update colorbar if we have a valid contour
-                if hasattr(colorbar, 'update_normal'):
-                    colorbar.update_normal(contour)
-        except Exception as e:
-            print(f"Warning: Could not create contour plot: {e}")
-            # Fallback to scatter plot if contour fails
-            valid_points = [(x[i], y[i], field_strength[i]) for i in range(len(x)) if field_strength[i] is not None]
-            if valid_points:
-                x_valid, y_valid, fs_valid = zip(*valid_points)
-                contour = ax.scatter(x_valid, y_valid, c=fs_valid, cmap="viridis", alpha=0.8)
+        # For 2D data, push the measurement grid straight into the mesh created by initialize_plot
+        Z = field_grid
+
+        # No contour polygons to rebuild: only the cell colors and the color range change
+        contour = ax.scan_mesh
+        contour.set_array(Z.ravel())
+        full_redraw = not ax.scan_blit
+        if ax.scan_fixed_norm:
+            clim = None  # Fixed color range: the colorbar stays as drawn
+        elif clim is None and not np.all(np.isnan(Z)):
+            clim = (np.nanmin(Z), np.nanmax(Z))
+        if clim is not None and clim[0] <= clim[1]:  # Nothing to scale until a point is measured
+            if clim != contour.get_clim():
+                contour.set_clim(*clim)
+                colorbar.update_normal(contour)
+                full_redraw = True  # The colorbar lies outside the blitted axes area
+
+        if full_redraw:
+            ax.figure.canvas.draw_idle()
+            ax.figure.canvas.flush_events()
+        else:
+            _blit_scan_mesh(ax)
+        return contour
     else:
+        # Clear the placeholder contour left by initialize_plot (only present before the first update)
+        for artist in list(ax.collections):
+            artist.remove()
+
         # For 1D data (only one y-value), use a line plot
-        sorted_data = sorted([(p["x"], p["field_strength"]) for p in results if p["field_strength"] is not None])
-        if sorted_data:  # Only proceed if we have valid data
-            x_sorted = [point[0] for point in sorted_data]
-            field_sorted = [point[1] for point in sorted_data]
+        measured = ~np.isnan(field_grid[0])
+        if measured.any():  # Only proceed if we have valid data
+            x_sorted = np.asarray(x_values)[measured]  # x_values is already in increasing order
+            field_sorted = field_grid[0][measured]
             
-            # Plot as a line
-            if hasattr(contour, 'remove'):
-                contour.remove()  # Remove previous line
-            contour = ax.plot(x_sorted, field_sorted, 'o-', color='blue', linewidth=2, alpha=0.8)[0]
+            # Plot as a line, created on the first update and then only given the new points
+            if contour in ax.lines:
+                contour.set_data(x_sorted, field_sorted)
+            else:
+                contour = ax.plot(x_sorted, field_sorted, 'o-', color='blue', linewidth=2, alpha=0.8)[0]
             
             # Set y-axis limits with a buffer
-            if field_sorted:  # Only set limits if we have data
-                y_min = min(field_sorted) - 5
-                y_max = max(field_sorted) + 5
+            if field_sorted.size:  # Only set limits if we have data
+                y_min = field_sorted.min() - 5
+                y_max = field_sorted.max() + 5
                 ax.set_ylim(y_min, y_max)
     
     ax.set_xlabel("X (mm)")
-    ax.set_ylabel("Y (mm)" if is_2d_data else "Field Strength (dBm)")
+    ax.set_ylabel("Field Strength (dBm)")
     ax.set_title("EM Field Strength (Interactive)")
     ax.set_aspect('auto')  # Changed from 'equal' to 'auto' for better display of 1D data
-    plt.pause(0.1)
+    # Schedule the redraw and service pending GUI events without plt.pause's fixed 100 ms sleep
+    ax.figure.canvas.draw_idle()
+    ax.figure.canvas.flush_events()
 
     return contour
 
@@ -174,15 +256,8 @@ def load_data(file_path):
             pcb_size = metadata.get("PCB_SIZE", [1.0, 1.0])  # Default to 1x1 if missing
             resolution = metadata.get("resolution", 30)  # Default resolution
             
-            # Create a 2D grid for the field strength
-            x_values = sorted(set(point["x"] for point in results))
-            y_values = sorted(set(point["y"] for point in results))
-            field_strength = np.full((len(y_values), len(x_values)), np.nan)  # Initialize with NaN
-            
-            for point in results:
-                x_idx = x_values.index(point["x"])
-                y_idx = y_values.index(point["y"])
-                field_strength[y_idx, x_idx] = point["field_strength"]
+            # Create a 2D grid for the field strength (NaN where no point was measured)
+            _, _, field_strength = results_to_grid(results)
             
             return field_strength, pcb_size, resolution
         else:
@@ -196,6 +271,50 @@ def compute_current_direction(args):
     # Compute current direction logic here
     return x, y, dx, dy
 
+def _orientation_fields(results_0d, results_90d, results_45d=None):
+    """
+    Unpack the orientation scans of a current-direction computation into columns.
+    
+    The scans are paired by position, keeping the points measured in every scan.
+    Field strengths are converted from dBm to linear scale for the vector
+    calculations; without a 45° scan its linear value is 1 (0 dBm).
+    
+    Returns:
+        Tuple of (x, y, field_0, field_90, field_45) numpy arrays
+    """
+    if results_45d:
+        x, y, (field_0_dBm, field_90_dBm, field_45_dBm) = align_scans(results_0d, results_90d, results_45d)
+    else:
+        x, y, (field_0_dBm, field_90_dBm) = align_scans(results_0d, results_90d)
+        field_45_dBm = np.zeros_like(field_0_dBm)
+    return x, y, 10 ** (field_0_dBm / 10), 10 ** (field_90_dBm / 10), 10 ** (field_45_dBm / 10)
+
+def _direction_grids(x, y, intensity, angle):
+    """
+    Place the points of a current-direction computation on a dense grid.
+    
+    np.unique's inverse indices give every point's grid cell directly, so each
+    grid is filled with a single scatter assignment.
+    
+    Args:
+        x, y: Point coordinates
+        intensity: Field intensity of each point
+        angle: Field orientation of each point in radians
+        
+    Returns:
+        Tuple of (unique_x, unique_y, Z_intensity, U, V), the grids indexed [yi, xi]
+        with NaN where there is no point; U and V are the unit direction components
+    """
+    unique_x, xi = np.unique(x, return_inverse=True)
+    unique_y, yi = np.unique(y, return_inverse=True)
+    Z_intensity = np.full((len(unique_y), len(unique_x)), np.nan)
+    U = np.full((len(unique_y), len(unique_x)), np.nan)
+    V = np.full((len(unique_y), len(unique_x)), np.nan)
+    Z_intensity[yi, xi] = intensity
+    U[yi, xi] = np.cos(angle)
+    V[yi, xi] = np.sin(angle)
+    return unique_x, unique_y, Z_intensity, U, V
+
 def show_currents(event):
     """Display current directions using arrows or streamlines and save intensity data.
     
@@ -254,40 +373,28 @@ def show_currents(event):
     results_90d = data_90d["results"]
     results_45d = data_45d["results"] if data_45d else None
 
-    # Compute angles and intensities for all points
-    results = []
-    for i, point_0d in enumerate(results_0d):
-        x = point_0d["x"]
-        y = point_0d["y"]
-        field_0_dBm = point_0d["field_strength"]
-        field_90_dBm = results_90d[i]["field_strength"]
-        field_45_dBm = results_45d[i]["field_strength"] if results_45d else 0
-
-        # Convert field strength from dBm to linear scale
-        # This is necessary because dBm is logarithmic, and we need linear values for vector calculations
-        field_0 = 10 ** (field_0_dBm / 10)
-        field_90 = 10 ** (field_90_dBm / 10) 
-        field_45 = 10 ** (field_45_dBm / 10)
-
-        # Compute the orientation of the field (angle estimation)
-        # The formula arctan2(B_90-B_0, B_45) estimates the field orientation
-        # based on the relative strength of the field measured at different probe angles
-        #angle = np.arctan2(field_90 - field_0, field_45)
-
-        # Corrected formula with 45° (π/4 radians) offset added
-        angle = np.arctan2(field_90 - field_0, field_45) + (np.pi / 4)
-
-        # Compute the field intensity using only 0° and 90°
-        # The intensity is calculated as the magnitude of the combined orthogonal components
-        intensity = np.sqrt(field_0**2 + field_90**2)
-
-        # Append results
-        results.append({
-            "x": x,
-            "y": y,
-            "field_strength": intensity,
-            "angle": angle
-        })
+    # Compute angles and intensities for all points at once, on whole columns
+    # Field strengths are converted from dBm to linear scale
+    # This is necessary because dBm is logarithmic, and we need linear values for vector calculations
+    x, y, field_0, field_90, field_45 = _orientation_fields(results_0d, results_90d, results_45d)
+
+    # Compute the orientation of the field (angle estimation)
+    # The formula arctan2(B_90-B_0, B_45) estimates the field orientation
+    # based on the relative strength of the field measured at different probe angles
+    #angle = np.arctan2(field_90 - field_0, field_45)
+
+    # Corrected formula with 45° (π/4 radians) offset added
+    angle = np.arctan2(field_90 - field_0, field_45) + (np.pi / 4)
+
+    # Compute the field intensity using only 0° and 90°
+    # The intensity is calculated as the magnitude of the combined orthogonal components
+    intensity = np.sqrt(field_0**2 + field_90**2)
+
+    # Point list for the debug file
+    results = [
+        {"x": px, "y": py, "field_strength": pi, "angle": pa}
+        for px, py, pi, pa in zip(x.tolist(), y.tolist(), intensity.tolist(), angle.tolist())
+    ]
 
     # Save intensity and angle data to _debug_intensity.json
     debug_intensity_file = "debug_intensity.json"
@@ -299,26 +406,8 @@ def show_currents(event):
         json.dump(debug_data, f, indent=4)
     print(f"Debug intensity and angle data saved to {debug_intensity_file}")
 
-    # Prepare data for visualization
-    x = [point["x"] for point in results]
-    y = [point["y"] for point in results]
-    intensity = [point["field_strength"] for point in results]
-    angle = [point["angle"] for point in results]
-
     # Create a grid for visualization
-    unique_x = sorted(set(x))
-    unique_y = sorted(set(y))
-    X, Y = np.meshgrid(unique_x, unique_y)
-    Z_intensity = np.full((len(unique_y), len(unique_x)), np.nan)
-    U = np.full((len(unique_y), len(unique_x)), np.nan)
-    V = np.full((len(unique_y), len(unique_x)), np.nan)
-
-    for point in results:
-        xi = unique_x.index(point["x"])
-        yi = unique_y.index(point["y"])
-        Z_intensity[yi, xi] = point["field_strength"]
-        U[yi, xi] = np.cos(point["angle"])
-        V[yi, xi] = np.sin(point["angle"])
+    unique_x, unique_y, Z_intensity, U, V = _direction_grids(x, y, intensity, angle)
 
     # Normalize the intensity for visualization
     # This ensures that the streamline coloring and width are properly scaled
@@ -326,8 +415,9 @@ def show_currents(event):
 
     # Plot streamlines with intensity-based linewidth
     try:
-        X_cm = X * 100
-        Y_cm = Y * 100
+        # streamplot takes the 1D axes directly, so no 2D coordinate arrays are built
+        X_cm = unique_x * 100
+        Y_cm = unique_y * 100
         stream = plot_ax.streamplot(
             X_cm, Y_cm, U, V,
             color=intensity_normalized,  # Use field intensity to color the streamlines
@@ -335,8 +425,8 @@ def show_currents(event):
             cmap='viridis',  # Color map for intensity visualization
             density=2.0  # Higher density provides more detailed current flow patterns
         )
-        plot_ax.set_xlim(min(x) * 100, max(x) * 100)
-        plot_ax.set_ylim(min(y) * 100, max(y) * 100)
+        plot_ax.set_xlim(unique_x[0] * 100, unique_x[-1] * 100)
+        plot_ax.set_ylim(unique_y[0] * 100, unique_y[-1] * 100)
 
         # Save the visualization as an image
         # Generate output filename by replacing the extension with "_current.jpg"
@@ -395,46 +485,34 @@ def show_alt_currents(event):
     results_90d = data_90d["results"]
     results_45d = data_45d["results"] if data_45d else None
 
-    # Compute angles and intensities for all points using alternative method
-    results = []
-    for i, point_0d in enumerate(results_0d):
-        x = point_0d["x"]
-        y = point_0d["y"]
-        field_0_dBm = point_0d["field_strength"]
-        field_90_dBm = results_90d[i]["field_strength"]
-        field_45_dBm = results_45d[i]["field_strength"] if results_45d else 0
-
-        # Convert field strength from dBm to linear scale
-        field_0 = 10 ** (field_0_dBm / 10)
-        field_90 = 10 ** (field_90_dBm / 10)
-        field_45 = 10 ** (field_45_dBm / 10)
-
-        # Compute the orientation of the field using ALTERNATIVE formula
-        # θ = arctan2(B₉₀, B₀) + π · step(-B₄₅ · ((B₀ + B₉₀)/√2))
-        
-        # 1. Calculate basic vector angle
-        theta_prelim = np.arctan2(field_90, field_0)
-        
-        # 2. Calculate expected 45° component and compare with actual
-        field_45_expected = (field_0 + field_90) / np.sqrt(2)
-        
-        # 3. Apply phase correction (add π if the sign of measured and expected 45° components differ)
-        comparison = field_45 * field_45_expected
-        phase_correction = np.pi if comparison < 0 else 0
-        
-        # 4. Final angle calculation
-        angle = theta_prelim + phase_correction
+    # Compute angles and intensities for all points using alternative method, on whole columns
+    # Field strengths are converted from dBm to linear scale
+    x, y, field_0, field_90, field_45 = _orientation_fields(results_0d, results_90d, results_45d)
 
-        # Compute the field intensity using only 0° and 90°
-        intensity = np.sqrt(field_0**2 + field_90**2)
+    # Compute the orientation of the field using ALTERNATIVE formula
+    # θ = arctan2(B₉₀, B₀) + π · step(-B₄₅ · ((B₀ + B₉₀)/√2))
+    
+    # 1. Calculate basic vector angle
+    theta_prelim = np.arctan2(field_90, field_0)
+    
+    # 2. Calculate expected 45° component and compare with actual
+    field_45_expected = (field_0 + field_90) / np.sqrt(2)
+    
+    # 3. Apply phase correction (add π if the sign of measured and expected 45° components differ)
+    comparison = field_45 * field_45_expected
+    phase_correction = np.where(comparison < 0, np.pi, 0.0)
+    
+    # 4. Final angle calculation
+    angle = theta_prelim + phase_correction
 
-        # Append results
-        results.append({
-            "x": x,
-            "y": y,
-            "field_strength": intensity,
-            "angle": angle
-        })
+    # Compute the field intensity using only 0° and 90°
+    intensity = np.sqrt(field_0**2 + field_90**2)
+
+    # Point list for the debug file
+    results = [
+        {"x": px, "y": py, "field_strength": pi, "angle": pa}
+        for px, py, pi, pa in zip(x.tolist(), y.tolist(), intensity.tolist(), angle.tolist())
+    ]
 
     # Save intensity and angle data to alt_debug_intensity.json
     alt_debug_intensity_file = "alt_debug_intensity.json"
@@ -446,34 +524,17 @@ def show_alt_currents(event):
         json.dump(debug_data, f, indent=4)
     print(f"Alternative debug intensity and angle data saved to {alt_debug_intensity_file}")
 
-    # Prepare data for visualization
-    x = [point["x"] for point in results]
-    y = [point["y"] for point in results]
-    intensity = [point["field_strength"] for point in results]
-    angle = [point["angle"] for point in results]
-
     # Create a grid for visualization
-    unique_x = sorted(set(x))
-    unique_y = sorted(set(y))
-    X, Y = np.meshgrid(unique_x, unique_y)
-    Z_intensity = np.full((len(unique_y), len(unique_x)), np.nan)
-    U = np.full((len(unique_y), len(unique_x)), np.nan)
-    V = np.full((len(unique_y), len(unique_x)), np.nan)
-
-    for point in results:
-        xi = unique_x.index(point["x"])
-        yi = unique_y.index(point["y"])
-        Z_intensity[yi, xi] = point["field_strength"]
-        U[yi, xi] = np.cos(point["angle"])
-        V[yi, xi] = np.sin(point["angle"])
+    unique_x, unique_y, Z_intensity, U, V = _direction_grids(x, y, intensity, angle)
 
     # Normalize the intensity for visualization
     intensity_normalized = Z_intensity / np.nanmax(Z_intensity)
 
     # Plot streamlines with intensity-based linewidth
     try:
-        X_cm = X * 100
-        Y_cm = Y * 100
+        # streamplot takes the 1D axes directly, so no 2D coordinate arrays are built
+        X_cm = unique_x * 100
+        Y_cm = unique_y * 100
         stream = plot_ax.streamplot(
             X_cm, Y_cm, U, V,
             color=intensity_normalized,  # Use field intensity to color the streamlines
@@ -481,8 +542,8 @@ def show_alt_currents(event):
             cmap='plasma',  # Different colormap to distinguish from regular method
             density=2.0  # Higher density provides more detailed current flow patterns
         )
-        plot_ax.set_xlim(min(x) * 100, max(x) * 100)
-        plot_ax.set_ylim(min(y) * 100, max(y) * 100)
+        plot_ax.set_xlim(unique_x[0] * 100, unique_x[-1] * 100)
+        plot_ax.set_ylim(unique_y[0] * 100, unique_y[-1] * 100)
 
         # Save the visualization as an image
         # Generate output filename by replacing the extension with "_altcurrent.jpg"
@@ -512,20 +573,9 @@ def show_debug_intensity(event):
         debug_data = json.load(f)
 
     results = debug_data["results"]
-    x = [point["x"] for point in results]
-    y = [point["y"] for point in results]
-    field_strength = [point["field_strength"] for point in results]
 
     # Create a grid for plotting
-    unique_x = sorted(set(x))
-    unique_y = sorted(set(y))
-    X, Y = np.meshgrid(unique_x, unique_y)
-    Z = np.full((len(unique_y), len(unique_x)), np.nan)
-
-    for point in results:
-        xi = unique_x.index(point["x"])
-        yi = unique_y.index(point["y"])
-        Z[yi, xi] = point["field_strength"]
+    unique_x, unique_y, Z = results_to_grid(results)
 
     # Access the plot_ax from the figure object
     fig = event.inaxes.figure
@@ -533,7 +583,7 @@ def show_debug_intensity(event):
 
     # Plot the intensity heatmap
     plot_ax.clear()
-    plot_ax.contourf(X, Y, Z, cmap="viridis", levels=50)
+    plot_ax.contourf(unique_x, unique_y, Z, cmap="viridis", levels=CONTOUR_LEVELS, **CONTOUR_KWARGS)
     plot_ax.set_title("Debug Intensity Heatmap")
     plot_ax.set_xlabel("X (mm)")
     plot_ax.set_ylabel("Y (mm)")
@@ -617,9 +667,8 @@ def plot_with_selector(file_0d, file_90d, file_45d=None):
             # Load and prepare data for contour plotting
             current_data, results, metadata, Z, extent = load_and_prepare_data(last_selected_file)
             grid_x, grid_y = np.linspace(extent[0], extent[1], 200), np.linspace(extent[2], extent[3], 200)
-            grid_X, grid_Y = np.meshgrid(grid_x, grid_y)
             ax = fig.main_plot_ax
-            ax.contour(grid_X, grid_Y, Z, levels=10, colors='black', linewidths=0.5)
+            ax.contour(grid_x, grid_y, Z, levels=10, colors='black', linewidths=0.5)
             fig.canvas.draw_idle()
             print(f"Contour lines added for file: {last_selected_file}")
         except Exception as e:
@@ -675,10 +724,10 @@ def plot_with_selector(file_0d, file_90d, file_45d=None):
             results = data
             metadata = {}
             
-        # Extract coordinates and field strengths
-        x = np.array([point["x"] for point in results]) * 100  # Convert to cm
-        y = np.array([point["y"] for point in results]) * 100
-        field_strength = np.array([point["field_strength"] for point in results])
+        # Extract coordinates and field strengths in one pass
+        x, y, field_strength = results_to_arrays(results)
+        x = x * 100  # Convert to cm
+        y = y * 100
         
         # Get unique coordinates for grid
         unique_x = np.unique(x)
@@ -687,10 +736,9 @@ def plot_with_selector(file_0d, file_90d, file_45d=None):
         # Prepare grid for interpolation
         grid_x = np.linspace(min(unique_x), max(unique_x), 200)
         grid_y = np.linspace(min(unique_y), max(unique_y), 200)
-        grid_X, grid_Y = np.meshgrid(grid_x, grid_y)
         
-        # Interpolate field values
-        Z = griddata((x, y), field_strength, (grid_X, grid_Y), method='cubic')
+        # Interpolate field values (a row and a column broadcast to the 200x200 grid)
+        Z = griddata((x, y), field_strength, (grid_x[np.newaxis, :], grid_y[:, np.newaxis]), method='cubic')
         
         # Calculate extent for plotting
         extent = [min(unique_x), max(unique_x), min(unique_y), max(unique_y)]
@@ -715,14 +763,9 @@ def plot_with_selector(file_0d, file_90d, file_45d=None):
             # Load and prepare data
             current_data, results, metadata, Z, extent = load_and_prepare_data(current_file)
             
-            # Load PCB image
-            try:
-                pcb_img = Image.open(PCB_IMAGE_PATH)
-                if VERTICAL_FLIP:
-                    pcb_img = pcb_img.transpose(Image.FLIP_TOP_BOTTOM)
-                pcb_img = np.array(pcb_img)
-            except Exception as e:
-                print(f"Error loading PCB image: {e}")
+            # PCB image (decoded once and cached)
+            pcb_img = _load_pcb_image()
+            if pcb_img is None:
                 pcb_img = np.zeros((100, 100, 3), dtype=np.uint8)  # Placeholder black image
             
             # Plot PCB overlay
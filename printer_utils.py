@@ -6,12 +6,13 @@
 # while simultaneously displaying real-time signal strength from the USRP.
 
 import tkinter as tk
-import threading
 import time
+import threading
+import queue
 import numpy as np
 import uhd  # Add uhd import here
 from radio_utils import get_power_dBm, measure_field_strength  # Add measure_field_strength import
-from config import RX_GAIN, DEFAULT_Z, PCB_SIZE_CM, MAX_HEIGHT_COMPONENT_X_MM, MAX_HEIGHT_COMPONENT_Y_MM, BUFFER_FLUSH_COUNT, PRINTER_WAIT, SIMULATE_USRP  # Add SIMULATE_USRP import
+from config import POWER_REFRESH_MS, POWER_POLL_MS, RX_GAIN, DEFAULT_Z, PCB_SIZE_CM, MAX_HEIGHT_COMPONENT_X_MM, MAX_HEIGHT_COMPONENT_Y_MM, BUFFER_FLUSH_COUNT, PRINTER_WAIT, SIMULATE_USRP  # Add SIMULATE_USRP import
 
 def send_gcode_command(command, printer_connection):
     """
@@ -71,23 +72,15 @@ def adjust_head(printer, usrp, streamer, simulate_usrp=SIMULATE_USRP):
         """Move the probe to a specified corner."""
         x, y = pcb_corners[corner]
         
-        # Step 1: Schedule the movement
-        printer.move_probe(x=0, y=0, z=z_height + z_lift, feedrate=3000)
-        printer.send_gcode("M400")  # Wait for movement completion
-        
-        printer.move_probe(x=x + x_offset, y=y + y_offset, z=z_height + z_lift, feedrate=3000)
-        printer.send_gcode("M400")  # Wait for movement completion
-        
-        printer.move_probe(x=x + x_offset, y=y + y_offset, z=z_height - z_lift, feedrate=3000)
-        printer.send_gcode("M400")  # Wait for movement completion
+        # Step 1: Lift, travel and land as one batch (single M400 at the end)
+        printer.move_probe_batch([
+            (0, 0, z_height + z_lift),
+            (x + x_offset, y + y_offset, z_height + z_lift),
+            (x + x_offset, y + y_offset, z_height - z_lift),
+        ], feedrate=3000)
         
         # Step 2: Restart RSSI (flush previous readings)
-        if not simulate_usrp and streamer is not None:
-            for _ in range(BUFFER_FLUSH_COUNT):
-                try:
-                    _ = get_power_dBm(streamer, RX_GAIN, debug=False, fast_mode=True)
-                except Exception:
-                    pass
+        flush_rssi()
         
         # Step 3: Wait for stabilization
         time.sleep(PRINTER_WAIT)
@@ -96,85 +89,77 @@ def adjust_head(printer, usrp, streamer, simulate_usrp=SIMULATE_USRP):
         """Move the probe to the highest component position."""
         x = MAX_HEIGHT_COMPONENT_X_MM  # Use constant from config.py
         y = MAX_HEIGHT_COMPONENT_Y_MM  # Use constant from config.py
-        # Lift the probe to a safe height before moving in X-Y
-        printer.move_probe(x=0, y=0, z=z_height + z_lift, feedrate=3000)  # Lift Z first
-        printer.send_gcode("M400")  # Add M400 to ensure movement completes
-        
-        printer.move_probe(x=x + x_offset, y=y + y_offset, z=z_height + z_lift, feedrate=3000)  # Travel to the max height position
-        printer.send_gcode("M400")  # Add M400 to ensure movement completes
-        
-        printer.move_probe(x=x + x_offset, y=y + y_offset, z=z_height, feedrate=3000)  # Land at max Z
-        printer.send_gcode("M400")  # Add M400 to ensure movement completes
+        # Lift the probe to a safe height, travel to the max height position and land at max Z
+        printer.move_probe_batch([
+            (0, 0, z_height + z_lift),
+            (x + x_offset, y + y_offset, z_height + z_lift),
+            (x + x_offset, y + y_offset, z_height),
+        ], feedrate=3000)
 
     def measure_power():
-        """Measure the radio power and update the label in a thread-safe way."""
-        # Add thread lock for print synchronization
-        print_lock = threading.Lock()
-        usrp_lock = threading.Lock()  # Lock for USRP streamer access
-        
-        while not done:
+        """Measure the radio power in a worker thread, keeping only the latest reading."""
+        rng = np.random.default_rng()  # Generator owned by this thread (no shared global RandomState)
+        while not stop_event.is_set():
             try:
-                # Store measurements locally first
-                local_power = None
-                
-                # Only continue if not done to prevent accessing closed resources
-                if done:
-                    break
-                
                 if simulate_usrp:  # Simulate USRP
-                    local_power = np.random.uniform(-70, -50)  # Simulated power in dBm
+                    power = rng.uniform(-70, -50)  # Simulated power in dBm
                 else:
-                    # Synchronize access to the USRP streamer
-                    with usrp_lock:
-                        # Use the same RSSI measurement routine as in the main scan
-                        local_power = measure_field_strength(streamer, RX_GAIN, debug=False)
-                        
-                        if local_power is not None and not np.isnan(local_power):
-                            with print_lock:
-                                print(f"ODDEBUG: Measured power: {local_power:.2f} dBm")
+                    # Use the same RSSI measurement routine as in the main scan
+                    with radio_lock:
+                        power = measure_field_strength(streamer, RX_GAIN, debug=False)
                 
-                # Update the UI in the main thread
-                if not done and root.winfo_exists():
-                    power_val = local_power
-                    if power_val is not None and not np.isnan(power_val):
-                        root.after(0, lambda p=power_val: power_label.config(text=f"Power: {p:.2f} dBm"))
-                    else:
-                        root.after(0, lambda: power_label.config(text="Power: Measuring..."))
+                # Replace any reading the GUI has not picked up yet, so readings never pile up
+                try:
+                    power_queue.put_nowait(power)
+                except queue.Full:
+                    try:
+                        power_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    power_queue.put_nowait(power)
             except Exception as e:
-                with print_lock:
-                    print(f"ERROR in measurement thread: {e}")
-                time.sleep(0.05)  # Small delay to avoid tight loops
+                print(f"ERROR measuring power: {e}")
             
-            time.sleep(0.1)  # Reduced loop frequency for stability
+            stop_event.wait(POWER_REFRESH_MS / 1000)
+
+    def poll_power():
+        """Show the latest power reading from the worker thread and schedule the next poll."""
+        nonlocal poll_id
+        try:
+            power = power_queue.get_nowait()
+            if power is not None and not np.isnan(power):
+                power_label.config(text=f"Power: {power:.2f} dBm")
+            else:
+                power_label.config(text="Power: Measuring...")
+        except queue.Empty:
+            pass
+        
+        poll_id = root.after(POWER_POLL_MS, poll_power)
+
+    def flush_rssi():
+        """Restart RSSI (flush previous readings) after a move."""
+        if not simulate_usrp and streamer is not None:
+            with radio_lock:
+                for _ in range(BUFFER_FLUSH_COUNT):
+                    try:
+                        _ = get_power_dBm(streamer, RX_GAIN, debug=False, fast_mode=True)
+                    except Exception:
+                        pass
 
     def done_callback():
         """Return to the correct Z height and exit."""
-        nonlocal done
-        # Signal the thread to stop before destroying the window
-        done = True
-        time.sleep(0.3)  # Give the thread more time to completely exit
+        # Stop the power readings before tearing the window down; the scan reuses the streamer
+        stop_event.set()
+        if poll_id is not None:
+            root.after_cancel(poll_id)
+        power_thread.join(timeout=2.0)
         
         # Move to final height - do this before destroying the window
         try:
             printer.send_gcode(f"G1 Z{z_height:.3f} F3000")
-            # Safely destroy AFTER all operations completed
-            safe_destroy()
         except Exception as e:
             print(f"ERROR in done_callback: {e}")
-            safe_destroy()
-    
-    def safe_destroy():
-        """Safely destroy the window from the main thread.
-        This function is critical for preventing Tcl_AsyncDelete errors.
-        """
-        try:
-            # Schedule destruction with a small delay to allow other operations to complete
-            root.after(200, lambda: actually_destroy())
-        except Exception as e:
-            print(f"ERROR scheduling window destruction: {e}")
-    
-    def actually_destroy():
-        """Actually perform the window destruction after all operations are complete."""
+        
         try:
             root.quit()
             root.destroy()
@@ -191,12 +176,7 @@ def adjust_head(printer, usrp, streamer, simulate_usrp=SIMULATE_USRP):
         printer.send_gcode("M400")  # Wait for movement completion
         
         # Step 2: Restart RSSI (flush previous readings)
-        if not simulate_usrp and streamer is not None:
-            for _ in range(BUFFER_FLUSH_COUNT):
-                try:
-                    _ = get_power_dBm(streamer, RX_GAIN, debug=False, fast_mode=True)
-                except Exception:
-                    pass
+        flush_rssi()
         
         # Step 3: Wait for stabilization
         time.sleep(PRINTER_WAIT)
@@ -267,51 +247,25 @@ def adjust_head(printer, usrp, streamer, simulate_usrp=SIMULATE_USRP):
                             font=("Helvetica", 14), fg="blue")
     rotation_label.place(x=120, y=480)  # Place below existing elements
 
-    # Start a thread for real-time power updates - make sure it's a daemon thread
-    # Daemon threads automatically terminate when the main program exits
-    done = False
+    # Measure the power in a worker thread so a slow USRP read never blocks the buttons;
+    # the Tk loop only polls a one-slot queue for the latest reading
+    power_queue = queue.Queue(maxsize=1)
+    radio_lock = threading.Lock()  # Serializes streamer access between the worker and the move handlers
+    stop_event = threading.Event()
     power_thread = threading.Thread(target=measure_power, daemon=True)
     power_thread.start()
+    poll_id = root.after(POWER_POLL_MS, poll_power)
 
     # Start the GUI event loop last to ensure everything is ready
     root.mainloop()
     
-    # Ensure thread cleanup before returning
-    # This is VERY important to avoid Tcl_AsyncDelete errors
-    done = True
-    try:
-        # Give the thread more time to fully exit
-        time.sleep(0.5)
-        
-        # Ensure all pending Tkinter events are processed
-        while root.winfo_exists():
-            try:
-                root.update()
-            except:
-                break
-            time.sleep(0.01)
-        
-        # Forcefully destroy any remaining Tk objects
-        try:
-            root.quit()
-            root.destroy()
-        except:
-            pass
-            
-        # Force Python's garbage collection to clean up Tkinter objects
-        import gc
-        gc.collect()
-        
-        # Clear any remaining Tcl interpreter resources
-        # This helps prevent cross-thread Tcl interpreter issues
-        try:
-            from tkinter import _tkinter
-            _tkinter.create()
-        except:
-            pass
-        
-    except Exception as e:
-        print(f"ERROR during thread cleanup: {e}")
+    # Also covers the window being closed without "Done"
+    stop_event.set()
+    power_thread.join(timeout=2.0)
+    
+    # Force Python's garbage collection to clean up Tkinter objects
+    import gc
+    gc.collect()
     
     # Return the final offsets
     return x_offset, y_offset, z_height
\ No newline at end of file
@@ -12,17 +12,176 @@ import uhd
 from uhd.types import RXMetadata  # Correct import for RXMetadata
 from uhd.usrp import StreamArgs  # Correct import for StreamArgs
 import time
-from config import DEBUG_ALL  # Import DEBUG_ALL
+from math import log10 as _log10  # Scalar log10 for per-point dBm conversions (no ufunc dispatch)
+from config import DEBUG_ALL, PCB_SIZE_CM, SIMULATED_NOISE_DB  # Import DEBUG_ALL and the PCB size and noise for simulation
 import threading  # Add this import for thread synchronization
 
+# numba is optional: when installed, simulated scan grids are filled by a compiled parallel kernel
+# and the received power is reduced by a compiled single-pass kernel
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 # Global lock for synchronized printing
 _print_lock = threading.Lock()
 
+# Streamer whose continuous stream is kept running between measurements (see start_streaming)
+_active_streamer = None
+
+# Upper bound on packets dropped when draining stale samples from a running stream
+MAX_DRAIN_PACKETS = 1000
+
+# Sample and power workspace reused by every measurement (see _get_workspace)
+_RX_BUF = np.empty(0, dtype=np.complex64)
+_POW_BUF = np.empty(0, dtype=np.float32)
+
+# Random generator for simulated measurements (Generator API, not the legacy global RandomState)
+_rng = np.random.default_rng()
+
 def synchronized_print(*args, **kwargs):
     """Thread-safe print function to prevent output corruption"""
     with _print_lock:
         print(*args, **kwargs)
 
+def start_streaming(streamer):
+    """
+    Start continuous streaming once and keep it running across measurements.
+    
+    While the stream is active, measurements drain the samples queued since the
+    previous call instead of stopping and restarting the stream every time.
+    
+    Args:
+        streamer: USRP RX streamer object
+    """
+    global _active_streamer
+    start_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.start_cont)
+    start_cmd.stream_now = True
+    streamer.issue_stream_cmd(start_cmd)
+    _active_streamer = streamer
+
+def stop_streaming(streamer):
+    """
+    Stop the continuous stream started by start_streaming.
+    
+    Args:
+        streamer: USRP RX streamer object
+    """
+    global _active_streamer
+    stop_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
+    streamer.issue_stream_cmd(stop_cmd)
+    if _active_streamer is streamer:
+        _active_streamer = None
+
+def simulate_em_field(x, y):
+    """
+    Synthetic field strength in dBm, used instead of the radio when SIMULATE_USRP is set.
+    
+    x and y are positions in cm and may have any broadcastable shapes, so a whole
+    scan grid is evaluated at once from a row vector and a column vector without
+    materializing meshgrid coordinate arrays.
+    
+    Args:
+        x: X positions in cm (e.g. shape (1, Nx))
+        y: Y positions in cm (e.g. shape (Ny, 1))
+        
+    Returns:
+        Field strength in dBm with the broadcast shape of x and y
+    """
+    return -60.0 + 10.0 * np.sin(np.pi * x / PCB_SIZE_CM[0]) * np.cos(np.pi * y / PCB_SIZE_CM[1])
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _simulate_scan_kernel(x_values, y_values, width, height, out):
+        """Compiled equivalent of simulate_em_field over a whole grid, one row per thread."""
+        for i in prange(y_values.size):
+            cos_y = np.cos(np.pi * y_values[i] / height)
+            for j in range(x_values.size):
+                out[i, j] = -60.0 + 10.0 * np.sin(np.pi * x_values[j] / width) * cos_y
+
+def simulate_scan(x_values, y_values, out=None, noise_db=SIMULATED_NOISE_DB):
+    """
+    Simulated field strength over a whole scan grid, for SIMULATE_USRP runs.
+    
+    Uses the numba kernel when numba is installed, otherwise simulate_em_field
+    with broadcasting; both give the same values. Measurement noise, if any, is
+    drawn for the whole grid in one call.
+    
+    Args:
+        x_values: X positions in cm (1D)
+        y_values: Y positions in cm (1D)
+        out: Optional preallocated float64 array of shape (len(y_values), len(x_values))
+        noise_db: Standard deviation in dB of Gaussian noise added to every point
+        
+    Returns:
+        Field strength grid in dBm indexed [y_idx, x_idx]
+    """
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+    if out is None:
+        out = np.empty((y_values.size, x_values.size))
+    if njit is not None:
+        _simulate_scan_kernel(x_values, y_values, PCB_SIZE_CM[0], PCB_SIZE_CM[1], out)
+    else:
+        out[...] = simulate_em_field(x_values[np.newaxis, :], y_values[:, np.newaxis])
+    if noise_db:
+        out += _rng.normal(0.0, noise_db, out.shape)
+    return out
+
+def _get_workspace(num_samples):
+    """
+    Return views of the shared sample and power buffers sized for num_samples.
+    
+    The buffers are only reallocated when a larger block is requested, so the
+    thousands of measurements in a scan reuse the same memory.
+    """
+    global _RX_BUF, _POW_BUF
+    if _RX_BUF.size < num_samples:
+        _RX_BUF = np.empty(num_samples, dtype=np.complex64)
+        _POW_BUF = np.empty(num_samples, dtype=np.float32)
+    return _RX_BUF[:num_samples], _POW_BUF[:num_samples]
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)
+    def _mean_power_kernel(iq):
+        """Mean |s|^2 over interleaved float32 I/Q values, fused into one pass."""
+        total = 0.0
+        for i in range(iq.size):
+            total += iq[i] * iq[i]
+        return total / (iq.size // 2)
+
+def _mean_power(samples, power):
+    """
+    Mean |s|^2 of samples.
+    
+    With numba, the float32 view of the samples is reduced in a single compiled
+    pass; otherwise the squares are computed in place in the power buffer.
+    """
+    if njit is not None:
+        return _mean_power_kernel(samples.view(np.float32))
+    np.square(samples.real, out=power)
+    power += np.square(samples.imag)
+    return power.mean()
+
+def _drain_stream(streamer, buffer, metadata):
+    """
+    Discard the samples already queued on the host so the next recv returns fresh data.
+    
+    The stream keeps running through printer moves, so the host buffer usually
+    overflows between points. UHD reports the overflow as a 0-sample recv with
+    error_code overflow, and the packets queued behind that marker were captured
+    while the head was still moving, so draining continues past it. It stops
+    only once the queue is really empty (timeout or no samples without overflow).
+    """
+    overflow = uhd.types.RXMetadataErrorCode.overflow
+    for _ in range(MAX_DRAIN_PACKETS):
+        try:
+            num_rx_samps = streamer.recv(buffer, metadata, 0.0)
+        except RuntimeError:
+            continue  # Ignore errors raised while draining and keep emptying the queue
+        if num_rx_samps == 0 and metadata.error_code != overflow:
+            break
+
 def measure_field_strength(streamer, rx_gain, debug=True):
     """
     Measure field strength using USRP streamer.
@@ -40,34 +199,41 @@ def measure_field_strength(streamer, rx_gain, debug=True):
         Field strength in dBm, or None if measurement fails
     """
     try:
-        # Step 1: Stop any ongoing streaming to clear the buffer
-        stop_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
-        streamer.issue_stream_cmd(stop_cmd)
-        time.sleep(0.01)  # Small delay to ensure the stop command is processed
-        
-        # Step 2: Start a fresh stream
-        start_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.start_cont)
-        start_cmd.stream_now = True
-        streamer.issue_stream_cmd(start_cmd)
-        
-        # Step 3: Discard initial samples to flush the buffer
-        discard_count = 10
-        buffer = np.zeros(1024, dtype=np.complex64)
+        buffer, power = _get_workspace(1024)  # Shared fc32 workspace, no allocation per point
         metadata = RXMetadata()
-        for _ in range(discard_count):
-            try:
-                streamer.recv(buffer, metadata, timeout=0.1)
-            except RuntimeError:
-                pass  # Ignore errors during discard phase
+        streaming = streamer is _active_streamer
+        
+        if streaming:
+            # Steps 1-3: The stream is kept running, so only drop the samples queued since the last call
+            _drain_stream(streamer, buffer, metadata)
+        else:
+            # Step 1: Stop any ongoing streaming to clear the buffer
+            stop_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
+            streamer.issue_stream_cmd(stop_cmd)
+            time.sleep(0.01)  # Small delay to ensure the stop command is processed
+            
+            # Step 2: Start a fresh stream
+            start_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.start_cont)
+            start_cmd.stream_now = True
+            streamer.issue_stream_cmd(start_cmd)
+            
+            # Step 3: Discard initial samples to flush the buffer
+            discard_count = 10
+            for _ in range(discard_count):
+                try:
+                    streamer.recv(buffer, metadata, timeout=0.1)
+                except RuntimeError:
+                    pass  # Ignore errors during discard phase
         
         # Step 4: Perform the actual measurement
         max_attempts = 4
         for attempt in range(1, max_attempts + 1):
             try:
-                stream_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.num_done)
-                stream_cmd.num_samps = 1024
-                stream_cmd.stream_now = True
-                streamer.issue_stream_cmd(stream_cmd)
+                if not streaming:
+                    stream_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.num_done)
+                    stream_cmd.num_samps = 1024
+                    stream_cmd.stream_now = True
+                    streamer.issue_stream_cmd(stream_cmd)
                 
                 num_rx_samps = streamer.recv(buffer, metadata, timeout=0.5)
                 if metadata.error_code != uhd.types.RXMetadataErrorCode.none:
@@ -76,9 +242,8 @@ def measure_field_strength(streamer, rx_gain, debug=True):
                     continue
                 
                 if num_rx_samps > 0:
-                    valid_samples = buffer[:num_rx_samps]
-                    power_linear = np.mean(np.abs(valid_samples)**2)
-                    power_dbm = 10 * np.log10(power_linear + 1e-12) + 30
+                    power_linear = _mean_power(buffer[:num_rx_samps], power[:num_rx_samps])  # Stays float32
+                    power_dbm = 10 * _log10(power_linear + 1e-12) + 30
                     input_power_dbm = power_dbm - rx_gain
                     return input_power_dbm
             except Exception as e:
@@ -155,6 +320,13 @@ def initialize_radio(center_frequency, rx_gain, equivalent_bw):
         finally:
             signal.signal(signal.SIGALRM, old_handler)  # Restore original handler
         
+        # Allocate the measurement workspace up front (default get_power_dBm block size)
+        _get_workspace(1024 * 10)
+        
+        # Start streaming once; measurements drain the running stream from now on
+        start_streaming(streamer)
+        synchronized_print("DEBUG: Continuous RX stream started")
+        
         synchronized_print("DEBUG: USRP initialization complete")
         return usrp, streamer
     except RuntimeError as e:
@@ -174,7 +346,7 @@ def get_power_dBm(streamer, rx_gain, num_samples=1024, num_averages=10, debug=Tr
         streamer: The USRP RX streamer object
         rx_gain: The receiver gain in dB
         num_samples: Number of samples to receive per measurement
-        num_averages: Number of measurements to average
+        num_averages: Number of frames to acquire and average as one block
         debug: Whether to print debug messages
         fast_mode: If True, use minimal averaging for faster response
         
@@ -186,49 +358,56 @@ def get_power_dBm(streamer, rx_gain, num_samples=1024, num_averages=10, debug=Tr
         if fast_mode:
             num_averages = 2  # Reduce averaging drastically
             
-        # CRITICAL FIX: Complete stream reset to clear all buffered samples
-        # First stop any ongoing streaming
-        stop_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
-        streamer.issue_stream_cmd(stop_cmd)
-        time.sleep(0.01)  # Small delay to ensure command is processed
-        
-        # Then issue a new stream command to start fresh
-        stream_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.start_cont)
-        stream_cmd.stream_now = True
-        streamer.issue_stream_cmd(stream_cmd)
-        
-        # Discard initial samples which might be stale
-        discard_count = 10  # Increased from implicit 0
-        buffer = np.zeros(num_samples, dtype=np.complex64)
+        # Acquire all averaging frames into one block of the shared workspace and reduce it once at the end
+        total_samples = num_samples * num_averages
+        samples, power = _get_workspace(total_samples)
+        buffer = samples[:num_samples]  # Scratch view for draining/discarding
         metadata = uhd.types.RXMetadata()
+        streaming = streamer is _active_streamer
         
-        # Actively discard samples to clear buffers
-        for _ in range(discard_count):
-            try:
-                streamer.recv(buffer, metadata, 0.01)  # Short timeout
-            except:
-                pass  # Ignore errors during discard
-        
-        # Fast mode needs less settling time after discard
-        if not fast_mode:
-            time.sleep(0.05)
+        if streaming:
+            # The stream is kept running: just drop the stale samples queued since the last call
+            _drain_stream(streamer, buffer, metadata)
         else:
-            time.sleep(0.01)
+            # CRITICAL FIX: Complete stream reset to clear all buffered samples
+            # First stop any ongoing streaming
+            stop_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
+            streamer.issue_stream_cmd(stop_cmd)
+            time.sleep(0.01)  # Small delay to ensure command is processed
+            
+            # Then issue a new stream command to start fresh
+            stream_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.start_cont)
+            stream_cmd.stream_now = True
+            streamer.issue_stream_cmd(stream_cmd)
+            
+            # Discard initial samples which might be stale
+            discard_count = 10  # Increased from implicit 0
+            
+            # Actively discard samples to clear buffers
+            for _ in range(discard_count):
+                try:
+                    streamer.recv(buffer, metadata, 0.01)  # Short timeout
+                except:
+                    pass  # Ignore errors during discard
+            
+            # Fast mode needs less settling time after discard
+            if not fast_mode:
+                time.sleep(0.05)
+            else:
+                time.sleep(0.01)
         
-        # Reset buffer for actual measurements
-        power_linear = []
+        received = 0
         
         # Increase max attempts to handle timeout errors
         attempts = 0
         max_attempts = num_averages * (2 if fast_mode else 3)  # Fewer attempts for fast mode
+        timeout = 0.05 if fast_mode else 0.1  # Shorter timeout for fast mode
         
-        # Loop to collect multiple measurements
-        while len(power_linear) < num_averages and attempts < max_attempts:
+        # Back-to-back receives straight into the block; no per-frame sleep or reduction
+        while received < total_samples and attempts < max_attempts:
             attempts += 1
             try:
-                # Shorter timeout for fast mode
-                timeout = 0.05 if fast_mode else 0.1
-                num_rx_samps = streamer.recv(buffer, metadata, timeout)
+                num_rx_samps = streamer.recv(samples[received:received + num_samples], metadata, timeout)
                 
                 # Handle metadata errors
                 if metadata.error_code != uhd.types.RXMetadataErrorCode.none:
@@ -236,39 +415,34 @@ def get_power_dBm(streamer, rx_gain, num_samples=1024, num_averages=10, debug=Tr
                         synchronized_print(f"WARNING: RX Metadata error: {metadata.error_code}")
                     continue
                 
-                if num_rx_samps > 0:
-                    # Calculate power for valid samples
-                    valid_samples = buffer[:num_rx_samps]
-                    sample_power = np.mean(np.abs(valid_samples)**2)
-                    if not np.isnan(sample_power) and sample_power > 0:
-                        power_linear.append(sample_power)
-                        if debug and not fast_mode:  # Skip debug in fast mode
-                            synchronized_print(f"DEBUG: Good measurement {len(power_linear)}/{num_averages}")
+                received += num_rx_samps
             except RuntimeError as e:
                 if "timeout" in str(e).lower() and debug and not fast_mode:
                     synchronized_print(f"NOTE: Timeout during receive, retrying ({attempts}/{max_attempts})")
                 elif debug and not fast_mode:
                     synchronized_print(f"ERROR during receive: {e}")
                     
-            # Minimal delay between measurements in fast mode
-            time.sleep(0.005 if fast_mode else 0.01)
-                    
-        # Stop continuous streaming
-        stop_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
-        streamer.issue_stream_cmd(stop_cmd)
+        # Stop continuous streaming unless it is meant to keep running
+        if not streaming:
+            stop_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont)
+            streamer.issue_stream_cmd(stop_cmd)
         
         # Check if we have any valid measurements
-        if not power_linear:  # Empty list
+        if received == 0:
             if debug and not fast_mode:
                 synchronized_print("WARNING: No valid power measurements obtained")
             return None
             
         if debug and not fast_mode:
-            synchronized_print(f"DEBUG: Obtained {len(power_linear)} valid power measurements")
+            synchronized_print(f"DEBUG: Obtained {received}/{total_samples} samples")
             
-        # Calculate the average power
-        avg_power_linear = np.mean(power_linear)
-        power_dbm = 10 * np.log10(avg_power_linear + 1e-12) + 30
+        # Calculate the average power in a single in-place pass (|s|^2 without np.abs's sqrt)
+        avg_power_linear = _mean_power(samples[:received], power[:received])
+        if np.isnan(avg_power_linear) or avg_power_linear <= 0:
+            if debug and not fast_mode:
+                synchronized_print("WARNING: No valid power measurements obtained")
+            return None
+        power_dbm = 10 * _log10(avg_power_linear + 1e-12) + 30
         input_power_dbm = power_dbm - rx_gain
         return input_power_dbm
     except Exception as e:
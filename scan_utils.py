@@ -5,7 +5,7 @@
 # The scanning process follows these steps:
 # 1. Connect to the 3D printer and USRP radio
 # 2. Allow the user to adjust the probe position
-# 3. Scan in a raster pattern at the first orientation (0°)
+# 3. Scan in a serpentine raster pattern at the first orientation (0°)
 # 4. Prompt the user to rotate the probe by 45°
 # 5. Perform a second scan at the diagonal orientation (45°)
 # 6. Prompt the user to rotate the probe by 90°
@@ -13,27 +13,75 @@
 # 8. Visualize the results
 
 from printer_utils import adjust_head
-from radio_utils import measure_field_strength, initialize_radio
-from file_utils import save_scan_results, combine_scans
+from radio_utils import measure_field_strength, initialize_radio, stop_streaming, simulate_scan
+from file_utils import save_scan_results, combine_scans, open_scan_log, append_scan_point, grid_to_results
+from file_utils import save_scan_results_npz, open_scan_grid
 from plot_utils import initialize_plot, update_plot, plot_field, plot_with_selector
 from d3d_printer import PrinterConnection
 from file_utils import show_rotate_probe_dialog, show_rotate_probe_dialog_45
 from config import (x_values, y_values, PCB_IMAGE_PATH, CENTER_FREQUENCY, RX_GAIN, nb_avera, 
-                  EQUIVALENT_BW, PRINTER_IP, PRINTER_PORT, SIMULATE_USRP, PCB_SIZE_CM, 
-                  RESOLUTION, DEBUG_ALL, DEBUG_INTERRACTIVE, MOVEMENT_SETTLE_DELAY, BUFFER_FLUSH_COUNT, PRINTER_WAIT, PRINTER_WAIT_LINE)
+                  EQUIVALENT_BW, PRINTER_IP, PRINTER_PORT, SIMULATE_USRP, SIMULATE_PRINTER, PCB_SIZE_CM, 
+                  RESOLUTION, DEBUG_ALL, DEBUG_INTERRACTIVE, DEBUG_MESSAGE, MOVEMENT_SETTLE_DELAY, BUFFER_FLUSH_COUNT, PRINTER_WAIT, PRINTER_WAIT_LINE,
+                  PLOT_UPDATE_INTERVAL_S, SCAN_LOG_FLUSH_EVERY, SERPENTINE_SCAN, SAVE_NPZ,
+                  SAVE_MEMMAP_GRID, ADAPTIVE_SCAN, ADAPTIVE_COARSE_STEP, ADAPTIVE_GRADIENT_DB, PRETTY_JSON)
 import matplotlib.pyplot as plt
+import numpy as np
 import time
 import gc
+import threading
+import queue
+
+def _coarse_indices(n, step):
+    """Every step-th index of an axis of n points, always ending with the last one."""
+    indices = list(range(0, n, step))
+    if indices[-1] != n - 1:
+        indices.append(n - 1)
+    return indices
+
+def refinement_mask(field_grid, y_coarse, x_coarse, threshold_db):
+    """
+    Select the grid points to measure after the coarse pass of an adaptive scan.
+    
+    The gradient of the coarse grid (in dB per coarse step) is computed with
+    np.gradient; around every coarse point where it exceeds threshold_db, or
+    where there is no valid value, the fine points up to the neighbouring coarse
+    points are selected. Points that are already measured are left out.
+    
+    Args:
+        field_grid: Dense measurement grid indexed [y_idx, x_idx], NaN where not measured
+        y_coarse: Row indices measured by the coarse pass
+        x_coarse: Column indices measured by the coarse pass
+        threshold_db: Gradient above which the neighbourhood is refined
+        
+    Returns:
+        Boolean array shaped like field_grid, True for the points still to measure
+    """
+    coarse = field_grid[np.ix_(y_coarse, x_coarse)]
+    grad_y = np.gradient(coarse, axis=0) if len(y_coarse) > 1 else np.zeros_like(coarse)
+    grad_x = np.gradient(coarse, axis=1) if len(x_coarse) > 1 else np.zeros_like(coarse)
+    flagged = ~(np.hypot(grad_x, grad_y) <= threshold_db)  # NaN (unknown) counts as flagged
+
+    mask = np.zeros(field_grid.shape, dtype=bool)
+    for i, j in zip(*np.nonzero(flagged)):
+        y_start, y_stop = y_coarse[max(i - 1, 0)], y_coarse[min(i + 1, len(y_coarse) - 1)]
+        x_start, x_stop = x_coarse[max(j - 1, 0)], x_coarse[min(j + 1, len(x_coarse) - 1)]
+        mask[y_start:y_stop + 1, x_start:x_stop + 1] = True
+    return mask & np.isnan(field_grid)
 
 def scan_single_orientation(file_name, printer, usrp, streamer, x_offset, y_offset, z_height):
     """
     Perform a single orientation scan across the defined grid.
     
     This function performs a raster scan, moving the probe in a pattern that:
-    1. Scans each row from minimum to maximum X
+    1. Scans each row along X, alternating direction between rows (SERPENTINE_SCAN)
+       so there is no return travel to minimum X
     2. Advances to the next Y position
     3. Shows real-time updates of the scan progress
     
+    With ADAPTIVE_SCAN, only every ADAPTIVE_COARSE_STEP-th point is measured
+    first; a second pass then measures the remaining points only where the
+    coarse field changes faster than ADAPTIVE_GRADIENT_DB (see refinement_mask).
+    
     For each position, it:
     1. Moves the 3D printer head to the specified coordinates
     2. Measures the field strength using the USRP radio
@@ -48,16 +96,102 @@ def scan_single_orientation(file_name, printer, usrp, streamer, x_offset, y_offs
         y_offset: Y-axis offset for the probe in mm
         z_height: Z-axis height for the probe in mm
     """
-    results = []
+    # Dense measurement grid filled in place (NaN = not measured); the results list
+    # of dicts is only built from it once, when the scan is saved
+    field_grid = np.full((len(y_values), len(x_values)), np.nan)
+    points_measured = 0
+    field_min, field_max = np.inf, -np.inf  # Running range of the measurements, for the color scale
     first_line_complete = False
-    power_values = []
     fig = None  # Store the figure reference for later closing
+    last_plot_time = 0.0  # Time of the last live plot redraw
+    # With both the radio and the printer simulated the redraw dominates the time per point, so only
+    # log progress; in every other mode the plot stays on, throttled to PLOT_UPDATE_INTERVAL_S
+    live_plot = DEBUG_INTERRACTIVE and not (SIMULATE_USRP and SIMULATE_PRINTER)
+    scan_log = None  # Write-through NDJSON log of the measured points
+    log_queue = queue.Queue()  # Points waiting for the log writer thread (None stops it)
+    log_writer = None
+    scan_grid = None  # Memory-mapped float32 copy of field_grid on disk (SAVE_MEMMAP_GRID)
+    metadata = {
+        "PCB_SIZE": PCB_SIZE_CM,
+        "resolution": RESOLUTION,
+        "center_freq": CENTER_FREQUENCY,  # Stored in Hz
+        "BW": EQUIVALENT_BW,  # Stored in Hz
+        "nb_average": nb_avera
+    }
+    pending_point = None  # Last measurement, recorded while the head travels to the next point
+    # Probe positions in mm as plain Python floats, computed once instead of per point from numpy scalars
+    x_list = x_values.tolist()
+    y_list = y_values.tolist()
+    x_mm = (x_values * 10 + x_offset).tolist()
+    y_mm = (y_values * 10 + y_offset).tolist()
+    if SIMULATE_USRP:
+        # Whole grid at once, before the first move
+        simulated_field = simulate_scan(x_values, y_values)
+
+    def write_log():
+        """Append queued points to the NDJSON log in a worker thread, off the scan loop."""
+        written = 0
+        while True:
+            point = log_queue.get()
+            if point is None:
+                break
+            try:
+                append_scan_point(scan_log, *point)
+                written += 1
+                if written % SCAN_LOG_FLUSH_EVERY == 0:
+                    scan_log.flush()
+            except Exception as e:
+                print(f"Error writing scan log: {e}")
+
+    def scan_rows():
+        """
+        Yield the rows to scan as (y_idx, x_indices), in scan order.
+        
+        For an adaptive scan the refinement rows are only computed once the
+        coarse pass is in field_grid (each row is recorded before the next starts).
+        """
+        if not ADAPTIVE_SCAN:
+            for y_idx in range(len(y_values)):
+                yield y_idx, range(len(x_values))
+            return
+        y_coarse = _coarse_indices(len(y_values), ADAPTIVE_COARSE_STEP)
+        x_coarse = _coarse_indices(len(x_values), ADAPTIVE_COARSE_STEP)
+        for y_idx in y_coarse:
+            yield y_idx, x_coarse
+        mask = refinement_mask(field_grid, y_coarse, x_coarse, ADAPTIVE_GRADIENT_DB)
+        print(f"Adaptive scan: coarse pass done, refining {int(mask.sum())} more of {mask.size} grid points")
+        for y_idx in np.flatnonzero(mask.any(axis=1)).tolist():
+            yield y_idx, np.flatnonzero(mask[y_idx]).tolist()
+
+    def record_point(y_idx, x_idx, x, y, field_strength):
+        """Store a measurement in the grid and the point log (host-side work only)."""
+        nonlocal points_measured, field_min, field_max
+        if field_strength is not None:
+            field_grid[y_idx, x_idx] = field_strength
+            if scan_grid is not None:
+                scan_grid[y_idx, x_idx] = field_strength
+            points_measured += 1
+            field_min = min(field_min, field_strength)
+            field_max = max(field_max, field_strength)
+            if log_writer is not None:
+                log_queue.put((x, y, field_strength))  # Serialized and written by write_log
+        else:
+            if DEBUG_ALL or DEBUG_INTERRACTIVE or not first_line_complete:
+                print(f"Warning: No field strength measured at X={x:.3f}, Y={y:.3f}")
 
     try:
+        # Points are appended here as they are measured so a crash does not lose the scan
+        scan_log = open_scan_log(file_name)
+        if scan_log is not None:
+            log_writer = threading.Thread(target=write_log, daemon=True)
+            log_writer.start()
+        if SAVE_MEMMAP_GRID:
+            scan_grid = open_scan_grid(file_name, x_values, y_values, metadata)
+        
         # Initialize the interactive plot with a more descriptive title
-        # Only create interactive plot if DEBUG_INTERRACTIVE is True
-        if DEBUG_INTERRACTIVE:
-            fig, ax, contour, colorbar = initialize_plot()
+        # Only create interactive plot if DEBUG_INTERRACTIVE is True (and not fully simulated)
+        if live_plot:
+            fig, ax, contour, colorbar = initialize_plot(x_values, y_values)
             orientation = "0°"
             if "_45d" in file_name:
                 orientation = "45°"
@@ -67,7 +201,8 @@ def scan_single_orientation(file_name, printer, usrp, streamer, x_offset, y_offs
             print(f"Interactive plot initialized for {orientation} orientation")
         
         # Main scanning loop
-        for y_idx, y in enumerate(y_values):
+        for row_number, (y_idx, x_indices) in enumerate(scan_rows()):
+            y = y_list[y_idx]
             # Wait for PRINTER_WAIT_LINE at the start of each new line
             time.sleep(PRINTER_WAIT_LINE)
             
@@ -82,19 +217,26 @@ def scan_single_orientation(file_name, printer, usrp, streamer, x_offset, y_offs
                 if DEBUG_ALL or DEBUG_INTERRACTIVE:
                     print(f"Error measuring initial RSSI at start of line {y_idx+1}: {e}")
 
-            for x_idx, x in enumerate(x_values):
-                # Step 1: Schedule the movement
-                printer.move_probe(
-                    x=(x * 10) + x_offset,
-                    y=(y * 10) + y_offset,
-                    z=z_height,
-                    debug=(DEBUG_ALL or DEBUG_INTERRACTIVE or not first_line_complete)
+            # Odd rows run from maximum to minimum X; x_idx still indexes x_values
+            if SERPENTINE_SCAN and row_number % 2 == 1:
+                x_indices = x_indices[::-1]
+
+            for x_idx in x_indices:
+                x = x_list[x_idx]
+                # Steps 1-2: Schedule the movement and its completion (G1 + M400 in one request)
+                printer.move_probe_batch(
+                    [(x_mm[x_idx], y_mm[y_idx], z_height)],
+                    debug=(DEBUG_ALL or DEBUG_MESSAGE or not first_line_complete),
+                    wait=False
                 )
+                move_started = time.monotonic()  # After the request returns: the stabilization time never includes the request itself
                 
-                # Step 2: Wait for movement completion
-                printer.send_gcode("M400")
-                if DEBUG_ALL or DEBUG_INTERRACTIVE:
-                    print("Waiting for printer movement to complete (M400)")
+                # While the head travels, record the previous point, then wait out the rest of
+                # the post-move stabilization time (the probe is stationary again before Step 3)
+                if pending_point is not None:
+                    record_point(*pending_point)
+                    pending_point = None
+                time.sleep(max(0.0, PRINTER_WAIT - (time.monotonic() - move_started)))
                 
                 # Step 3: Restart RSSI (flush previous readings)
                 if not SIMULATE_USRP and streamer is not None:
@@ -111,46 +253,54 @@ def scan_single_orientation(file_name, printer, usrp, streamer, x_offset, y_offs
                 
                 # Step 5: Perform RSSI measurement
                 try:
-                    field_strength = measure_field_strength(
-                        streamer, RX_GAIN,
-                        debug=(DEBUG_ALL or DEBUG_INTERRACTIVE or not first_line_complete)
-                    )
+                    if SIMULATE_USRP:
+                        field_strength = float(simulated_field[y_idx, x_idx])
+                    else:
+                        field_strength = measure_field_strength(
+                            streamer, RX_GAIN,
+                            debug=(DEBUG_ALL or DEBUG_INTERRACTIVE or not first_line_complete)
+                        )
                     if field_strength is not None:
-                        power_values.append(field_strength)
-                        if DEBUG_INTERRACTIVE:
+                        if DEBUG_MESSAGE:
                             print(f"Measured field strength: {field_strength:.2f} dBm")
                 except Exception as e:
                     if DEBUG_ALL or DEBUG_INTERRACTIVE or not first_line_complete:
                         print(f"Error measuring field strength: {e}")
                     field_strength = None
 
-                if field_strength is not None:
-                    results.append({
-                        "x": float(x),
-                        "y": float(y),
-                        "field_strength": float(field_strength)
-                    })
-                else:
-                    if DEBUG_ALL or DEBUG_INTERRACTIVE or not first_line_complete:
-                        print(f"Warning: No field strength measured at X={x:.3f}, Y={y:.3f}")
+                # Recorded during the next move (or at the end of the row)
+                pending_point = (y_idx, x_idx, x, y, field_strength)
 
-            # Update the plot after completing each X line, but only if interactive mode is enabled
-            if DEBUG_INTERRACTIVE and fig is not None:
-                contour = update_plot(ax, contour, colorbar, results, x_values, y_values)
-                print(f"Updated plot after completing row {y_idx+1}/{len(y_values)} (y={y:.3f})")
-            elif DEBUG_ALL or not first_line_complete:
+            # The row is complete: record its last point before plotting it
+            if pending_point is not None:
+                record_point(*pending_point)
+                pending_point = None
+            if scan_grid is not None:
+                scan_grid.flush()  # Persist the finished row (a few dirty pages at most)
+
+            # Update the plot after completing an X line, but only if interactive mode is enabled
+            # and at most once per PLOT_UPDATE_INTERVAL_S (the final row is always drawn)
+            if live_plot and fig is not None:
+                last_row = y_idx == len(y_values) - 1
+                if last_row or time.monotonic() - last_plot_time > PLOT_UPDATE_INTERVAL_S:
+                    contour = update_plot(ax, contour, colorbar, field_grid, x_values, y_values,
+                                          clim=(field_min, field_max))
+                    last_plot_time = time.monotonic()
+                    print(f"Updated plot after completing row {y_idx+1}/{len(y_values)} (y={y:.3f})")
+            elif DEBUG_ALL or DEBUG_INTERRACTIVE or not first_line_complete:
                 print(f"Completed row {y_idx+1}/{len(y_values)} (y={y:.3f})")
             
             # Calculate and display average power after first line is complete
             if not first_line_complete:
                 first_line_complete = True
-                if power_values:
-                    avg_power = sum(power_values) / len(power_values)
+                power_values = field_grid[y_idx][~np.isnan(field_grid[y_idx])]
+                if power_values.size:
+                    avg_power = power_values.mean()
                     print(f"\n=== SCAN PROGRESS ===")
                     print(f"First line completed.")
                     print(f"Average power: {avg_power:.2f} dBm")
-                    print(f"Number of valid measurements: {len(power_values)}/{len(x_values)}")
-                    print(f"Min power: {min(power_values):.2f} dBm, Max power: {max(power_values):.2f} dBm")
+                    print(f"Number of valid measurements: {power_values.size}/{len(x_indices)}")
+                    print(f"Min power: {power_values.min():.2f} dBm, Max power: {power_values.max():.2f} dBm")
                     if not DEBUG_INTERRACTIVE and not DEBUG_ALL:
                         print(f"=== DEBUG OUTPUT REDUCED ===\n")
                 else:
@@ -159,26 +309,40 @@ def scan_single_orientation(file_name, printer, usrp, streamer, x_offset, y_offs
                     if not DEBUG_INTERRACTIVE and not DEBUG_ALL:
                         print("=== DEBUG OUTPUT REDUCED ===\n")
 
+        # The refinement pass of an adaptive scan may not end on the last row: draw the final grid
+        if ADAPTIVE_SCAN and live_plot and fig is not None:
+            contour = update_plot(ax, contour, colorbar, field_grid, x_values, y_values,
+                                  clim=(field_min, field_max))
+
     except KeyboardInterrupt:
         print("\nScan interrupted by user. Cleaning up...")
     finally:
+        # Keep a measurement that was still waiting to be recorded when the scan stopped
+        if pending_point is not None:
+            record_point(*pending_point)
+        
+        # Let the writer drain the queued points, then close the log (flushes the remaining points)
+        if log_writer is not None:
+            log_queue.put(None)
+            log_writer.join()
+        if scan_log is not None:
+            scan_log.close()
+        if scan_grid is not None:
+            scan_grid.flush()
+            scan_grid = None  # Unmap the grid file
+        
         # Save results to a JSON file if any data was collected
+        results = grid_to_results(field_grid, x_values, y_values)
         if results:
-            metadata = {
-                "PCB_SIZE": PCB_SIZE_CM,
-                "resolution": RESOLUTION,
-                "center_freq": CENTER_FREQUENCY,  # Stored in Hz
-                "BW": EQUIVALENT_BW,  # Stored in Hz
-                "nb_average": nb_avera
-            }
-
-            save_scan_results(file_name, results, metadata)
+            save_scan_results(file_name, results, metadata, pretty=PRETTY_JSON)
             print(f"Scan results saved to {file_name}")
+            if SAVE_NPZ:
+                save_scan_results_npz(file_name, x_values, y_values, field_grid, metadata)
         else:
             print("No results to save.")
             
         # Close the plot window if it was created
-        if fig is not None and DEBUG_INTERRACTIVE:
+        if fig is not None:
             plt.close(fig)
             print("Closed interactive scan window")
 
@@ -223,6 +387,8 @@ def scan_field(file_name):
     # Terminate if the printer connection fails
     if not connection_status or not printer.connected:  # Updated to check `printer.connected`
         print("Failed to connect to the 3D printer. Check IP address, port, and password. Exiting scan.")
+        if streamer is not None:
+            stop_streaming(streamer)
         return
 
     try:
@@ -237,9 +403,6 @@ def scan_field(file_name):
         x_offset, y_offset, z_height = adjust_head(printer, usrp, streamer)
         print("Graphical adjustment completed.")
         
-        # Ensure the measure_power thread is terminated before proceeding
-        time.sleep(0.5)  # Allow the thread to fully terminate
-        
         # Add a delay after GUI operations before starting the next GUI
         # This helps ensure Tkinter resources are properly cleaned up
         time.sleep(1.0)
@@ -282,7 +445,7 @@ def scan_field(file_name):
         # Generate and save the combined scan results (using only 0° and 90° data)
         print("Generating combined results from 0° and 90° scans...")
         data_combined = combine_scans(file_0d, file_90d)
-        save_scan_results(file_combined, data_combined["results"], data_combined["metadata"])
+        save_scan_results(file_combined, data_combined["results"], data_combined["metadata"], pretty=PRETTY_JSON)
         print(f"Combined results saved to {file_combined}")
         
         # Display the complete scan results
@@ -292,5 +455,9 @@ def scan_field(file_name):
     except KeyboardInterrupt:
         print("\nScan interrupted by user. Cleaning up...")
     finally:
+        # Stop the continuous RX stream started by initialize_radio
+        if streamer is not None:
+            stop_streaming(streamer)
+        
         # Ensure the printer is disconnected properly
         printer.disconnect()
\ No newline at end of file
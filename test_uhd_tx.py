@@ -22,10 +22,25 @@ Configuration:
 import uhd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
 from scipy.signal import welch
+import scipy.fft
 import threading
-import queue
 import time
+import math
+
+# numba is optional: when installed, the test tone is generated by a compiled phasor recurrence
+# and the spectrum is converted to dB and averaged by one compiled pass
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# numexpr is optional: when installed, the per-frame dB conversion and averaging run as fused passes
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
 
 # Transmission parameters
 freq_tx = 400e6  # Transmit frequency in Hz (400 MHz)
@@ -39,6 +54,8 @@ rx_gain = 60  # Increased receive gain in dB
 fft_size = 2048  # Increased FFT size for better resolution
 buffer_multiplier = 10  # Number of buffers to average
 
+fft_workers = -1  # scipy.fft worker threads (-1 = all CPUs); they split multi-frame transforms
+
 def generate_tone(sample_rate, tone_freq, amplitude, duration=1.0):
     """
     Generate a sine wave tone for transmission.
@@ -55,10 +72,109 @@ def generate_tone(sample_rate, tone_freq, amplitude, duration=1.0):
     Returns:
         NumPy array containing the generated tone samples
     """
-    t = np.arange(0, duration, 1 / sample_rate)
+    # Integer sample count: a float-step arange can come out one sample long or short
+    num_samples = int(round(duration * sample_rate))
+    phase_step = 2 * np.pi * tone_freq / sample_rate
+    if njit is not None:
+        tone = np.empty(num_samples, dtype=np.complex64)
+        _fill_tone(tone, phase_step, amplitude)
+        return tone
+    t = np.arange(num_samples) / sample_rate
     tone = amplitude * np.exp(2j * np.pi * tone_freq * t)  # Complex sine wave
     return tone.astype(np.complex64)
 
+if njit is not None:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _fill_tone(out, phase_step, amplitude):
+        """
+        Complex tone by phasor recurrence: one complex multiply per sample instead of an exp.
+        
+        The phasor is kept in double precision and re-anchored to the exact value every
+        4096 samples, so amplitude and phase errors cannot accumulate over long tones.
+        Each 4096-sample block starts from its own exact phasor, so the blocks are
+        filled in parallel.
+        """
+        w = np.exp(1j * phase_step)
+        for block in prange((out.size + 4095) // 4096):
+            start = block * 4096
+            z = amplitude * np.exp(1j * phase_step * start)
+            for i in range(start, min(start + 4096, out.size)):
+                out[i] = z
+                z *= w
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _update_db_ewma(spectra, avg, alpha, split):
+        """
+        Fold a batch of FFT frames into the fftshifted dB average in a single pass.
+        
+        Bin d of avg is bin (d + split) % n of each frame; the frames are applied
+        oldest first, exactly like one EWMA update per frame.
+        """
+        num_frames, n = spectra.shape
+        decay = np.float32(1.0) - alpha  # float32 constants keep the loop in single precision
+        scale = np.float32(10.0) * alpha
+        eps = np.float32(1e-24)
+        for d in prange(n):
+            src = (d + split) % n
+            value = avg[d]
+            for k in range(num_frames):
+                re = spectra[k, src].real
+                im = spectra[k, src].imag
+                value = decay * value + scale * math.log10(re * re + im * im + eps)
+            avg[d] = value
+
+class SampleRing:
+    """
+    Single-producer/single-consumer ring of preallocated sample buffers.
+    
+    The receive thread writes straight into the next free slot and publishes it by
+    advancing head; plot_fft copies the pending slots out and frees them by advancing
+    tail. Only the producer writes head and only the consumer writes tail,
+    so neither side takes a lock or allocates per frame.
+    """
+    
+    def __init__(self, num_slots, slot_size):
+        """
+        Args:
+            num_slots: Number of frames that can be in flight
+            slot_size: Capacity of each slot in samples
+        """
+        self.slots = np.empty((num_slots, slot_size), dtype=np.complex64)
+        self.counts = [0] * num_slots  # Valid samples in each slot
+        self.head = 0  # Frames published (producer only)
+        self.tail = 0  # Frames consumed or skipped (consumer only)
+    
+    def free_slot(self):
+        """Slot the producer may write next, or None if the consumer has not freed one yet."""
+        if self.head - self.tail >= len(self.slots):
+            return None
+        return self.slots[self.head % len(self.slots)]
+    
+    def publish(self, count):
+        """Hand the slot returned by free_slot, holding count samples, to the consumer."""
+        self.counts[self.head % len(self.slots)] = count
+        self.head += 1
+    
+    def drain(self, out):
+        """
+        Copy every pending frame into the rows of out, oldest first, and free their slots.
+        
+        Each row receives the first out.shape[1] samples of a frame; shorter frames are
+        dropped. At most len(out) frames are taken.
+        
+        Returns:
+            Number of rows filled
+        """
+        rows = 0
+        row_size = out.shape[1]
+        while self.tail != self.head and rows < len(out):
+            index = self.tail % len(self.slots)
+            if self.counts[index] >= row_size:
+                out[rows] = self.slots[index, :row_size]
+                rows += 1
+            self.tail += 1
+        return rows
+
 def transmit(tx_streamer, tone, tx_metadata, stop_event):
     """
     Transmit the tone continuously in a separate thread.
@@ -75,66 +191,84 @@ def transmit(tx_streamer, tone, tx_metadata, stop_event):
     chunk_size = min(tx_streamer.get_max_num_samps(), 1024)  # Limit chunk size
     print(f"Using chunk size: {chunk_size}")
     
-    # Pre-generate tone buffer
-    num_chunks = 10  # Keep several chunks in memory
-    tone_buffer = np.tile(tone[:chunk_size], num_chunks)
+    # Ring of contiguous chunk views covering the whole tone, sent in rotation: each send is
+    # a single packet's worth of samples, and since the tone holds whole periods the phase
+    # stays continuous from one chunk to the next (repeating tone[:chunk_size] would not)
+    tone_buffer = np.ascontiguousarray(tone, dtype=np.complex64)
+    chunks = [tone_buffer[start:start + chunk_size] for start in range(0, tone_buffer.size, chunk_size)]
+    chunk_index = 0
+    
+    # tx_metadata opens the burst; every later send uses a second metadata object built once
+    # with start_of_burst=False, instead of writing the attribute through pybind on every send
+    continuation_metadata = uhd.types.TXMetadata()
+    continuation_metadata.start_of_burst = False
+    continuation_metadata.end_of_burst = False
+    continuation_metadata.has_time_spec = False
+    metadata = tx_metadata
     
     while not stop_event.is_set():
         try:
-            tx_streamer.send(tone_buffer, tx_metadata)
-            tx_metadata.start_of_burst = False
+            tx_streamer.send(chunks[chunk_index], metadata)
+            metadata = continuation_metadata
+            chunk_index = (chunk_index + 1) % len(chunks)
         except RuntimeError as e:
+            if "timeout" in str(e).lower():
+                continue  # Just retry: idling here would starve the transmit buffer
             print(f"Tx Error: {e}")
-            time.sleep(0.1)  # Back off on error
+            time.sleep(0.1)  # Back off on real errors so they do not flood the console
 
-def receive(rx_streamer, rx_metadata, sample_queue, stop_event):
+def receive(rx_streamer, rx_metadata, sample_ring, stop_event):
     """
-    Receive samples and put them into a queue for processing.
+    Receive samples into a ring of buffers for processing.
     
-    This function continuously receives samples from the USRP and
-    places them in a queue for FFT calculation and display.
+    This function continuously receives samples from the USRP directly
+    into the free slots of the ring for FFT calculation and display.
     
     Args:
         rx_streamer: USRP RX streamer object
         rx_metadata: Reception metadata
-        sample_queue: Queue for passing samples to processing thread
+        sample_ring: SampleRing shared with the processing thread
         stop_event: Threading event to signal reception stop
     """
-    max_samps = min(rx_streamer.get_max_num_samps(), 2048)
-    buffer = np.zeros(max_samps, dtype=np.complex64)
+    max_samps = min(rx_streamer.get_max_num_samps(), sample_ring.slots.shape[1])
+    overflow = np.empty(max_samps, dtype=np.complex64)  # Keeps draining the stream while the ring is full
     
+    # No sleep in this loop: recv blocks until a packet arrives or its timeout expires
     while not stop_event.is_set():
         try:
-            num_rx_samps = rx_streamer.recv(buffer, rx_metadata)
-            if num_rx_samps > 0:
-                if sample_queue.qsize() < 2:  # Keep only recent samples
-                    sample_queue.put(buffer[:num_rx_samps].copy())
-            time.sleep(0.001)  # Small delay to prevent tight loop
+            slot = sample_ring.free_slot()
+            if slot is None:
+                rx_streamer.recv(overflow, rx_metadata)
+            else:
+                num_rx_samps = rx_streamer.recv(slot[:max_samps], rx_metadata)
+                if num_rx_samps > 0:
+                    sample_ring.publish(num_rx_samps)
         except RuntimeError as e:
             if "timeout" in str(e).lower():
                 continue
             print(f"Rx Error: {e}")
 
-def plot_fft(sample_queue, fft_size, sample_rate, stop_event):
+def plot_fft(sample_ring, fft_size, sample_rate, stop_event):
     """
     Plot the FFT of received samples in real time.
     
     This function provides a real-time spectrum display of the received
-    signal, with averaging for a more stable visualization.
+    signal, with averaging for a more stable visualization. A FuncAnimation
+    timer drives the updates at a steady rate and blits only the spectrum
+    line; this function returns when the window is closed or stop_event is set.
     
     Args:
-        sample_queue: Queue containing received samples
+        sample_ring: SampleRing filled by the receive thread
         fft_size: Size of the FFT calculation
         sample_rate: Sample rate for frequency axis scaling
         stop_event: Threading event to signal plot thread stop
     """
-    plt.ion()
     fig = plt.figure(figsize=(10, 6))
     ax = fig.add_subplot(111)
     
     # Configure plot
     freqs = np.fft.fftshift(np.fft.fftfreq(fft_size, 1/sample_rate))
-    line, = ax.plot(freqs, np.zeros(fft_size))
+    line, = ax.plot(freqs, np.zeros(fft_size, dtype=np.float32), animated=True)  # Drawn by blitting only
     ax.set_ylim(-120, -20)
     ax.set_xlim(-sample_rate/4, sample_rate/4)
     ax.grid(True)
@@ -143,35 +277,75 @@ def plot_fft(sample_queue, fft_size, sample_rate, stop_event):
     ax.set_ylabel("Magnitude (dB)")
     plt.tight_layout()
     
-    # Initialize averaging
-    avg_buffer = np.zeros(fft_size)
-    alpha = 0.3
+    # Initialize averaging. The running average and the combined batch spectrum it is updated
+    # from are the two rows of one float32 array, so the update streams through adjacent memory
+    state = np.zeros((2, fft_size), dtype=np.float32)
+    avg_buffer = state[0]
+    combined = state[1]
+    alpha = np.float32(0.3)
     
-    while not stop_event.is_set():
+    # Every frame pending in the ring is transformed in one batch. Folding the rows into the
+    # EWMA oldest first is the same as one weighted sum: frame k of n gets alpha*(1-alpha)^(n-1-k)
+    max_frames = len(sample_ring.slots)
+    ewma_weights = (alpha * (1 - alpha) ** np.arange(max_frames - 1, -1, -1)).astype(np.float32)
+    
+    # Work buffers reused by every batch, so the processing below allocates almost nothing per frame
+    batch = np.empty((max_frames, fft_size), dtype=np.complex64)
+    mag = np.empty((max_frames, fft_size), dtype=np.float32)
+    
+    # fftshift as a static halves swap: (destination in avg_buffer, source slice of the spectrum),
+    # so the shifted spectrum is accumulated directly and never copied
+    split = (fft_size + 1) // 2  # Start of the negative frequencies in FFT order
+    shift_halves = ((avg_buffer[:fft_size - split], slice(split, None)),
+                    (avg_buffer[fft_size - split:], slice(None, split)))
+    
+    def update(frame):
+        """Fold the pending frames into the average; FuncAnimation blits the returned line."""
+        if stop_event.is_set():
+            plt.close(fig)
+            return (line,)
         try:
-            if sample_queue.empty():
-                plt.pause(0.05)
-                continue
-                
-            samples = sample_queue.get_nowait()
-            if len(samples) >= fft_size:
-                # Process the samples
-                fft_data = np.fft.fftshift(np.fft.fft(samples[:fft_size]))
-                fft_mag = 20 * np.log10(np.abs(fft_data) + 1e-12)
-                
-                # Update average
-                avg_buffer = (1 - alpha) * avg_buffer + alpha * fft_mag
-                
-                # Update plot
-                line.set_ydata(avg_buffer)
-                fig.canvas.draw_idle()
-                plt.pause(0.05)
-                
-        except queue.Empty:
-            plt.pause(0.05)
+            # Copy out every pending frame; their slots are free again once copied
+            num_frames = sample_ring.drain(batch)
+            if num_frames == 0:
+                return (line,)
+            
+            # One transform for the whole batch (the FFT may overwrite the copies)
+            fft_data = scipy.fft.fft(batch[:num_frames], axis=-1, overwrite_x=True, workers=fft_workers)
+            if njit is not None:
+                # Magnitude in dB, shift and average fused in one compiled pass
+                _update_db_ewma(fft_data, avg_buffer, alpha, split)
+            else:
+                frame_mag = mag[:num_frames]
+            
+                # Magnitude in dB
+                if ne is not None:
+                    # One fused pass from the real/imag views: 10*log10(|X|^2) needs no sqrt
+                    # (eps is passed as float32: a float literal would make numexpr compute in float64)
+                    ne.evaluate("10 * log10(re * re + im * im + eps)",
+                                local_dict={"re": fft_data.real, "im": fft_data.imag, "eps": np.float32(1e-24)},
+                                out=frame_mag)
+                else:
+                    np.abs(fft_data, out=frame_mag)
+                    frame_mag += 1e-12
+                    np.log10(frame_mag, out=frame_mag)
+                    frame_mag *= 20
+            
+                # Update average in place, writing each half of the spectrum to the other side
+                np.dot(ewma_weights[max_frames - num_frames:], frame_mag, out=combined)
+                np.multiply(avg_buffer, (1 - alpha) ** num_frames, out=avg_buffer)  # In place (closure variable)
+                for dst, src in shift_halves:
+                    dst += combined[src]
+            
+            # Update plot
+            line.set_ydata(avg_buffer)
         except Exception as e:
             print(f"Plot error: {e}")
-            plt.pause(0.05)
+        return (line,)
+    
+    # Keep a reference to the animation: it stops when garbage collected
+    ani = FuncAnimation(fig, update, interval=30, blit=True, cache_frame_data=False)
+    plt.show()
 
 def main():
     """
@@ -230,6 +404,8 @@ def main():
     rx_max_samps = min(rx_streamer.get_max_num_samps(), 2048)
     rx_buffer = np.zeros((rx_max_samps,), dtype=np.complex64)
     print(f"Created receive buffer with {rx_max_samps} samples")
+    # Zero samples sent with the end-of-burst flag, sized from the FFT
+    tx_end_buffer = np.zeros(fft_size, dtype=np.complex64)
 
     # Create a TXMetadata object for continuous transmission
     tx_metadata = uhd.types.TXMetadata()
@@ -240,8 +416,8 @@ def main():
     # Create an RXMetadata object for receiving samples
     rx_metadata = uhd.types.RXMetadata()
 
-    # Create a queue for received samples
-    sample_queue = queue.Queue(maxsize=10)  # Limit queue size
+    # Create a ring of receive buffers shared by the receive and plot threads
+    sample_ring = SampleRing(4, rx_max_samps)
 
     # Create a stop event for thread termination
     stop_event = threading.Event()
@@ -252,7 +428,7 @@ def main():
                                daemon=True)
     
     rx_thread = threading.Thread(target=receive,
-                               args=(rx_streamer, rx_metadata, sample_queue, stop_event),
+                               args=(rx_streamer, rx_metadata, sample_ring, stop_event),
                                daemon=True)
 
     try:
@@ -265,7 +441,7 @@ def main():
         tx_thread.start()
         print("Transmit thread started")
         
-        plot_fft(sample_queue, fft_size, sample_rate, stop_event)
+        plot_fft(sample_ring, fft_size, sample_rate, stop_event)
     except KeyboardInterrupt:
         print("\nTransmission and reception stopped by user.")
     finally:
@@ -282,8 +458,9 @@ def main():
         rx_thread.join()
 
         # End the transmission
+        tx_metadata.start_of_burst = False
         tx_metadata.end_of_burst = True
-        tx_streamer.send(np.zeros(fft_size, dtype=np.complex64), tx_metadata)
+        tx_streamer.send(tx_end_buffer, tx_metadata)
         print("Transmission ended.")
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+"""
+Combining orientation scans whose point sets differ.
+
+An adaptive scan (ADAPTIVE_SCAN) refines a different set of points for every
+probe orientation, so the saved results of the 0° and 90° scans have different
+lengths and orders. combine_scans must pair their points by position.
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def file_utils(monkeypatch):
+    """Import file_utils from the repository."""
+    monkeypatch.syspath_prepend(REPO_DIR)
+    import file_utils
+    return file_utils
+
+
+def adaptive_results(field, x_values, y_values, refined):
+    """Results of an adaptive scan: the coarse points (every other one) first, then the refined points."""
+    coarse = [(j, i) for j in range(0, len(y_values), 2) for i in range(0, len(x_values), 2)]
+    points = coarse + [p for p in refined if p not in coarse]
+    return [{"x": float(x_values[i]), "y": float(y_values[j]), "field_strength": float(field[j, i])}
+            for j, i in points]
+
+
+def test_combine_adaptive_scans_pairs_points_by_position(file_utils, tmp_path):
+    x_values = np.round(np.arange(0, 2.0, 0.25), 2)
+    y_values = np.round(np.arange(0, 1.5, 0.25), 2)
+    xx, yy = np.meshgrid(x_values, y_values)
+    field_0d = -60 + 5 * np.sin(xx) * np.cos(yy)
+    field_90d = -70 + 3 * np.cos(xx + yy)
+
+    # Each orientation refines its own region, so the two scans have different lengths
+    results_0d = adaptive_results(field_0d, x_values, y_values, [(1, 1), (1, 3), (3, 1), (3, 5)])
+    results_90d = adaptive_results(field_90d, x_values, y_values, [(3, 5), (1, 3), (5, 7)])
+    assert len(results_0d) != len(results_90d)
+
+    file_0d = str(tmp_path / "scan_0d.json")
+    file_90d = str(tmp_path / "scan_90d.json")
+    for filename, results in ((file_0d, results_0d), (file_90d, results_90d)):
+        with open(filename, "w") as f:
+            json.dump({"metadata": {}, "results": results}, f)
+
+    combined = file_utils.combine_scans(file_0d, file_90d)["results"]
+
+    # Only the positions measured in both scans, each combined with its own counterpart
+    common = {(p["x"], p["y"]) for p in results_0d} & {(p["x"], p["y"]) for p in results_90d}
+    assert {(p["x"], p["y"]) for p in combined} == common
+    for point in combined:
+        i = int(np.argmin(np.abs(x_values - point["x"])))
+        j = int(np.argmin(np.abs(y_values - point["y"])))
+        expected = 10 * np.log10(np.hypot(10 ** (field_0d[j, i] / 10), 10 ** (field_90d[j, i] / 10)))
+        assert point["field_strength"] == pytest.approx(expected)
@@ -52,6 +52,23 @@ def parse_args():
     return parser.parse_args()
 
 
+def aligned_complex64(num_samples, align=64):
+    """
+    Return an empty complex64 array whose data starts on an `align`-byte boundary.
+    
+    UHD converts fc32 to sc16 with SIMD loads, which avoid cache-line splits when
+    the buffer is aligned. The array is a view into a slightly larger allocation.
+    
+    Args:
+        num_samples: Number of complex samples
+        align: Alignment in bytes (a multiple of 8, the size of one sample)
+    """
+    itemsize = np.dtype(np.complex64).itemsize
+    raw = np.empty(num_samples + align // itemsize, dtype=np.complex64)
+    offset = (-raw.ctypes.data) % align // itemsize
+    return raw[offset:offset + num_samples]
+
+
 def multi_usrp_tx(args):
     """
     multi_usrp based TX example for continuous signal generation.
@@ -90,20 +107,26 @@ def multi_usrp_tx(args):
     
     # Generate shorter data buffer for better handling
     buffer_size = min(int(args.rate * 0.1), 8192)  # 100ms worth of samples or 8192, whichever is smaller
-    data = np.ones(buffer_size, dtype=np.complex64)  # Constant tone
+    data = aligned_complex64(buffer_size)  # Built once and sent for the whole transmission
+    data.fill(1.0 + 0j)  # Constant tone
     
-    # Setup metadata
+    # Setup metadata: the first send opens the burst, later sends reuse a continuation
+    # object instead of clearing start_of_burst through pybind on every send
     tx_metadata = uhd.types.TXMetadata()
     tx_metadata.start_of_burst = True
     tx_metadata.has_time_spec = False
+    continuation_metadata = uhd.types.TXMetadata()
+    continuation_metadata.start_of_burst = False
+    continuation_metadata.has_time_spec = False
+    metadata = tx_metadata
     
     start_time = time.time()
     print(f"Starting transmission for {args.duration} seconds...")
     
     try:
         while (time.time() - start_time) < args.duration:
-            tx_streamer.send(data, tx_metadata)
-            tx_metadata.start_of_burst = False
+            tx_streamer.send(data, metadata)
+            metadata = continuation_metadata
             
             # Print status every 30 seconds
             elapsed = time.time() - start_time
@@ -120,8 +143,10 @@ def multi_usrp_tx(args):
     finally:
         # Cleanup
         print("Stopping transmission...")
+        tx_metadata.start_of_burst = False
         tx_metadata.end_of_burst = True
-        tx_streamer.send(np.zeros(10, dtype=np.complex64), tx_metadata)
+        data[:10].fill(0)  # The tone buffer is no longer needed; reuse it for the end-of-burst zeros
+        tx_streamer.send(data[:10], tx_metadata)
         time.sleep(0.1)  # Allow time for cleanup
 
 
@@ -200,8 +225,14 @@ def rfnoc_dram_tx(args):
             # If we are using this API, we need to upload the entire waveform,
             # we can't make use of looping over the same memory region over and
             # over again.
-            data = np.tile(data, int(args.duration * args.rate // len(data)) + 1)
-            data = data[: args.duration * args.rate]
+            # Repeat the waveform straight into a buffer of the target length: one
+            # allocation and one pass, instead of tiling past the end and slicing
+            target = int(args.duration * args.rate)
+            repeated = np.empty(target, dtype=data.dtype)
+            full = target // len(data)
+            repeated[: full * len(data)].reshape(full, len(data))[:] = data
+            repeated[full * len(data) :] = data[: target - full * len(data)]
+            data = repeated
         # This if-branch is completely redundant, but we keep it here as this is
         # an example and we want to showcase different ways of using the
         # DramTransmitter class.